@@ -0,0 +1,172 @@
+import os
+import math
+import statistics
+from typing import Callable, Dict, List, Optional
+
+from app.evaluators.gpt_judge import JUDGE_BATCH_SIZE
+
+# Questions in the first round; every later round doubles the total
+ADAPTIVE_MIN_QUESTIONS = int(os.getenv("ADAPTIVE_MIN_QUESTIONS", "3"))
+# Smallest score standard deviation an interval assumes (scores are 1-10),
+# so a few identical scores do not look like certainty
+ADAPTIVE_MIN_STDEV = float(os.getenv("ADAPTIVE_MIN_STDEV", "0.5"))
+
+
+def llm_calls(questions: int, pipelines: int, batch_judging: bool = True) -> int:
+    """Generation plus judge calls to answer and score ``questions`` on ``pipelines``"""
+    if not pipelines:
+        return 0
+    judge_calls = math.ceil(pipelines / JUDGE_BATCH_SIZE) if batch_judging else pipelines
+    return questions * (pipelines + judge_calls)
+
+
+def t_quantile(p: float, df: int) -> float:
+    """Quantile ``p`` of Student's t distribution with ``df`` degrees of freedom
+
+    Exact for 1 and 2 degrees of freedom, otherwise the Cornish-Fisher
+    expansion around the normal quantile (within 1% from 3 up, for p <= 0.995).
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = statistics.NormalDist().inv_cdf(p)
+    return (
+        z
+        + (z ** 3 + z) / (4 * df)
+        + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+        + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3)
+        + (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / (92160 * df ** 4)
+    )
+
+
+def answer_score(result) -> float:
+    """One judged answer as a single number: its mean 1-10 score"""
+    m = result.metrics
+    return (m.accuracy + m.relevance + m.completeness) / 3
+
+
+class SuccessiveHalving:
+    """Evaluate pipelines on growing question subsets, dropping clear losers.
+
+    Round r evaluates the surviving pipelines on the next questions so
+    that min_questions * 2**r have been asked in total. After each round a
+    pipeline is eliminated when the upper bound of its score's confidence
+    interval falls below the leader's lower bound. Intervals use Student's t
+    for the few scores there are and a floor on the standard deviation, so
+    tied or constant scores never eliminate on a tiny difference. With a
+    ``budget`` of LLM calls, a round that would overrun it first halves the
+    field (keeping the best half by mean score), then asks fewer
+    questions; the run stops when not even one more question fits. It also stops as soon as only
+    one pipeline is left.
+    """
+
+    def __init__(
+        self,
+        pipelines: List[str],
+        batch_judging: bool = True,
+        budget: Optional[int] = None,
+        min_questions: int = ADAPTIVE_MIN_QUESTIONS,
+        confidence: float = 0.95,
+        min_stdev: float = ADAPTIVE_MIN_STDEV,
+    ):
+        self.pipelines = list(pipelines)
+        self.batch_judging = batch_judging
+        self.budget = budget
+        self.min_questions = max(2, min_questions)
+        self.confidence = confidence
+        self.min_stdev = min_stdev
+
+    def run(self, questions: List[str], evaluate: Callable[[List[str], List[str]], List[Dict]]) -> Dict:
+        """Run the rounds; ``evaluate(questions, pipelines)`` returns one judged result dict per question"""
+        active = list(self.pipelines)
+        scores: Dict[str, List[float]] = {name: [] for name in active}
+        eliminated: Dict[str, Dict] = {}
+        results: List[Dict] = []
+        rounds: List[Dict] = []
+        used = 0
+        asked = 0
+        target = min(self.min_questions, len(questions))
+        budget_exhausted = False
+
+        # A lone pipeline still gets one round, so there is something to report
+        while asked < len(questions) and (len(active) > 1 or not rounds):
+            batch = questions[asked:target]
+            dropped: Dict[str, str] = {}
+
+            if self.budget is not None:
+                remaining = self.budget - used
+                # Halving needs scores to rank by, so not before round 1
+                while asked and len(active) > 1 and llm_calls(len(batch), len(active), self.batch_judging) > remaining:
+                    ranked = sorted(active, key=lambda name: statistics.fmean(scores[name]), reverse=True)
+                    keep = ranked[:math.ceil(len(ranked) / 2)]
+                    for name in ranked[len(keep):]:
+                        dropped[name] = "budget"
+                        eliminated[name] = {"round": len(rounds) + 1, "questions": len(scores[name]), "reason": "budget"}
+                    active = keep
+                affordable = remaining // llm_calls(1, len(active), self.batch_judging)
+                if affordable < 1:
+                    budget_exhausted = True
+                    break
+                batch = batch[:affordable]
+
+            round_pipelines = list(active)
+            round_calls = llm_calls(len(batch), len(round_pipelines), self.batch_judging)
+            for question_result in evaluate(batch, round_pipelines):
+                results.append(question_result)
+                for name, result in question_result.items():
+                    scores[name].append(answer_score(result))
+            used += round_calls
+            asked += len(batch)
+
+            intervals = {name: self._interval(scores[name]) for name in active}
+            leader = max(active, key=lambda name: intervals[name][1])
+            for name in active:
+                if intervals[name][2] < intervals[leader][0]:
+                    dropped[name] = "confidence"
+            active = [name for name in active if name not in dropped]
+
+            for name, reason in dropped.items():
+                eliminated.setdefault(name, {"round": len(rounds) + 1, "questions": len(scores[name]), "reason": reason})
+            rounds.append({
+                "round": len(rounds) + 1,
+                "questions": asked,
+                "pipelines": round_pipelines,
+                "leader": leader,
+                "eliminated": sorted(dropped),
+                "llm_calls": round_calls,
+                "intervals": {
+                    name: [round(bound, 2) if math.isfinite(bound) else None for bound in intervals[name]]
+                    for name in round_pipelines
+                },
+            })
+            print(f"🏁 Round {len(rounds)}: {asked} questions, {len(round_pipelines)} pipelines, leader {leader}, dropped {sorted(dropped)}")
+
+            target = min(len(questions), max(target * 2, asked + 1))
+
+        if budget_exhausted:
+            print(f"⚠️  LLM call budget {self.budget} exhausted after {asked} questions")
+
+        exhaustive = llm_calls(len(questions), len(self.pipelines), self.batch_judging)
+        return {
+            "results": results,
+            "survivors": active,
+            "rounds": rounds,
+            "eliminated": eliminated,
+            "questions_evaluated": asked,
+            "budget_exhausted": budget_exhausted,
+            "llm_calls": used,
+            "exhaustive_llm_calls": exhaustive,
+            "saved_llm_calls": exhaustive - used,
+        }
+
+    def _interval(self, scores: List[float]) -> tuple:
+        """(lower bound, mean, upper bound) of the mean score"""
+        mean = statistics.fmean(scores)
+        if len(scores) < 2:
+            return (-math.inf, mean, math.inf)
+        stdev = max(statistics.stdev(scores), self.min_stdev)
+        # Half-width in standard errors, from t with n - 1 degrees of freedom
+        t = t_quantile((1 + self.confidence) / 2, len(scores) - 1)
+        half_width = t * stdev / math.sqrt(len(scores))
+        return (mean - half_width, mean, mean + half_width)
@@ -1,27 +1,42 @@
-import json
 import os
-import httpx
-from groq import Groq
-from typing import Dict
+import json
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
+from app.llm.client import get_llm_client
+from app.evaluators.judge_cache import JudgeCache, get_judge_cache, verdict_key
+from app.metrics import record_llm_usage
+
 # Load environment variables FIRST
 load_dotenv()
 
+# Bump when a prompt changes so cached verdicts from the old wording are ignored
+PROMPT_VERSION = "single-v1"
+BATCH_PROMPT_VERSION = "batch-v2"
+# Most answers scored in one batched call; each takes up to
+# JUDGE_TOKENS_PER_ANSWER completion tokens, which must stay within the
+# model's completion limit
+JUDGE_BATCH_SIZE = int(os.getenv("JUDGE_BATCH_SIZE", "8"))
+JUDGE_TOKENS_PER_ANSWER = 300
+
 class GPTJudge:
     """Evaluates RAG outputs using Groq's FREE LLMs"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[JudgeCache] = None, use_cache: bool = True):
         # Using Groq's fast and FREE models
         self.model = "llama-3.1-8b-instant"
-        # Initialize client INSIDE __init__, not at class level
-        self.client = Groq(
-    api_key=os.getenv("GROQ_API_KEY"),
-    http_client=httpx.Client()
-)
+        # Shared pooled client, same connection pool as the pipelines
+        self.client = get_llm_client()
+        # Verdicts that parsed cleanly are reused across runs
+        self.cache = (cache if cache is not None else get_judge_cache()) if use_cache else None
     
     def evaluate(self, question: str, answer: str, context: list) -> Dict:
         """Evaluate a single RAG output"""
+        key = verdict_key(self.model, PROMPT_VERSION, question, answer, context)
+        if self.cache is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
         
         prompt = f"""You are evaluating a RAG (Retrieval-Augmented Generation) system's output.
 
@@ -48,7 +63,7 @@ Respond ONLY with valid JSON in this exact format:
 }}"""
 
         try:
-            response = self.client.chat.completions.create(
+            response = self.client.complete(
                 model=self.model,
                 messages=[
                     {"role": "system", "content": "You are an expert RAG system evaluator. Always respond with valid JSON."},
@@ -58,23 +73,17 @@ Respond ONLY with valid JSON in this exact format:
                 max_tokens=300
             )
             
+            record_llm_usage("judge", response.usage)
             result_text = response.choices[0].message.content.strip()
             
-            # Remove markdown code blocks if present
-            if "```json" in result_text:
-                result_text = result_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in result_text:
-                result_text = result_text.split("```")[1].split("```")[0].strip()
-            
             # Parse JSON response
-            result = json.loads(result_text)
-            
-            # Validate scores are in range
-            for key in ['accuracy', 'relevance', 'completeness']:
-                if key not in result:
-                    result[key] = 5
-                result[key] = max(1, min(10, result[key]))
+            result = json.loads(self._strip_code_fences(result_text))
+            # Missing scores are filled in below, but such a verdict is not cached
+            complete = all(isinstance(result.get(k), (int, float)) for k in ['accuracy', 'relevance', 'completeness'])
+            result = self._clamp_scores(result)
             
+            if self.cache is not None and complete:
+                self.cache.put(key, result)
             return result
             
         except json.JSONDecodeError:
@@ -99,4 +108,137 @@ Respond ONLY with valid JSON in this exact format:
         formatted = ""
         for i, chunk in enumerate(context, 1):
             formatted += f"[Context {i}]: {chunk}\n\n"
-        return formatted
\ No newline at end of file
+        return formatted
+    
+    def evaluate_batch(self, question: str, outputs: Dict[str, Dict]) -> Dict[str, Dict]:
+        """Score every pipeline's answer to one question in as few calls as possible
+        
+        ``outputs`` maps pipeline name to a dict with ``answer`` and
+        ``context``. Uncached answers are judged JUDGE_BATCH_SIZE at a
+        time; a group falls back to one ``evaluate`` call per answer when
+        its batched reply does not match the expected JSON array.
+        """
+        keys = {
+            name: verdict_key(self.model, BATCH_PROMPT_VERSION, question, out["answer"], out["context"])
+            for name, out in outputs.items()
+        }
+        
+        cached = {}
+        if self.cache is not None:
+            for name, key in keys.items():
+                verdict = self.cache.get(key)
+                if verdict is not None:
+                    cached[name] = verdict
+        
+        # Only the answers without a cached verdict go to the judge
+        names = [name for name in outputs if name not in cached]
+        for start in range(0, len(names), JUDGE_BATCH_SIZE):
+            group = names[start:start + JUDGE_BATCH_SIZE]
+            if len(group) == 1:
+                cached[group[0]] = self.evaluate(question, outputs[group[0]]["answer"], outputs[group[0]]["context"])
+            else:
+                cached.update(self._evaluate_group(question, outputs, group, keys))
+        return {name: cached[name] for name in outputs}
+    
+    def _evaluate_group(self, question: str, outputs: Dict[str, Dict], names: List[str], keys: Dict[str, str]) -> Dict[str, Dict]:
+        """Score the answers of ``names`` in one call"""
+        # Pipelines often retrieve the same passages; each is sent once and
+        # the answers refer to it by number
+        passages: Dict[str, int] = {}
+        answers_text = ""
+        for name in names:
+            refs = [f"P{passages.setdefault(passage, len(passages) + 1)}" for passage in outputs[name]["context"]]
+            answers_text += f"""### ANSWER ID: {name}
+
+RETRIEVED CONTEXT: {", ".join(refs) or "none"}
+GENERATED ANSWER:
+{outputs[name]["answer"]}
+
+"""
+        passages_text = "".join(f"[P{number}]: {passage}\n\n" for passage, number in passages.items())
+        
+        prompt = f"""You are evaluating the outputs of several RAG (Retrieval-Augmented Generation) systems for the same question.
+
+QUESTION: {question}
+
+CONTEXT PASSAGES (each answer lists the passages it was given):
+{passages_text}{answers_text}Evaluate EACH answer independently on three dimensions (rate 1-10):
+
+1. ACCURACY: Is the answer factually correct based on its own retrieved context passages?
+2. RELEVANCE: Does it directly answer the question asked?
+3. COMPLETENESS: Does it cover all important aspects of the question?
+
+Respond ONLY with a valid JSON array containing exactly one object per answer ID, in this exact format:
+[
+  {{
+    "id": "<answer id>",
+    "accuracy": <score 1-10>,
+    "relevance": <score 1-10>,
+    "completeness": <score 1-10>,
+    "reasoning": "<brief explanation of scores>"
+  }}
+]"""
+        
+        result_text = ""
+        try:
+            response = self.client.complete(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "You are an expert RAG system evaluator. Always respond with valid JSON."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.3,
+                max_tokens=JUDGE_TOKENS_PER_ANSWER * len(names)
+            )
+            
+            record_llm_usage("judge", response.usage)
+            result_text = response.choices[0].message.content.strip()
+            results = self._parse_batch(result_text, names)
+            
+        except Exception as e:
+            print(f"⚠️  Batch judging failed ({str(e)}), scoring answers one by one. Response: {result_text[:200]}")
+            results = {name: self.evaluate(question, outputs[name]["answer"], outputs[name]["context"]) for name in names}
+        else:
+            if self.cache is not None:
+                for name, result in results.items():
+                    self.cache.put(keys[name], result)
+        
+        return results
+    
+    def _parse_batch(self, result_text: str, names: List[str]) -> Dict[str, Dict]:
+        """Validate a batched reply: a JSON array with one scored object per ID"""
+        items = json.loads(self._strip_code_fences(result_text))
+        if not isinstance(items, list):
+            raise ValueError("expected a JSON array")
+        
+        results = {}
+        for item in items:
+            if not isinstance(item, dict) or item.get("id") not in names:
+                raise ValueError(f"unexpected item: {item}")
+            for key in ['accuracy', 'relevance', 'completeness']:
+                if not isinstance(item.get(key), (int, float)):
+                    raise ValueError(f"missing numeric {key} for {item['id']}")
+            results[item.pop("id")] = self._clamp_scores(item)
+        
+        if set(results) != set(names):
+            raise ValueError(f"missing scores for {sorted(set(names) - set(results))}")
+        
+        for result in results.values():
+            result.setdefault("reasoning", "")
+        return {name: results[name] for name in names}
+    
+    def _strip_code_fences(self, result_text: str) -> str:
+        """Remove markdown code blocks if present"""
+        if "```json" in result_text:
+            return result_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in result_text:
+            return result_text.split("```")[1].split("```")[0].strip()
+        return result_text
+    
+    def _clamp_scores(self, result: Dict) -> Dict:
+        """Validate scores are in range"""
+        for key in ['accuracy', 'relevance', 'completeness']:
+            if key not in result:
+                result[key] = 5
+            result[key] = max(1, min(10, result[key]))
+        return result
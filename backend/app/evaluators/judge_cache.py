@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, List, Optional
+
+JUDGE_CACHE_PATH = os.getenv("JUDGE_CACHE_PATH", "./data/judge_cache.sqlite")
+JUDGE_CACHE_MAX_ENTRIES = int(os.getenv("JUDGE_CACHE_MAX_ENTRIES", "50000"))
+
+
+def verdict_key(model: str, prompt_version: str, question: str, answer: str, context: List[str]) -> str:
+    """Hash everything that can change a verdict"""
+    payload = json.dumps([model, prompt_version, question, answer, context], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class JudgeCache:
+    """SQLite store of judge verdicts with least-recently-used eviction"""
+
+    def __init__(self, path: str = JUDGE_CACHE_PATH, max_entries: int = JUDGE_CACHE_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "key TEXT PRIMARY KEY, verdict TEXT NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_accessed ON verdicts(accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            row = self._conn.execute("SELECT verdict FROM verdicts WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE verdicts SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, verdict: Dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts (key, verdict, accessed) VALUES (?, ?, ?)",
+                (key, json.dumps(verdict), time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM verdicts WHERE key IN "
+                "(SELECT key FROM verdicts ORDER BY accessed ASC LIMIT ?)",
+                (count - self.max_entries,)
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self)}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM verdicts")
+            self._conn.commit()
+
+
+_judge_cache: Optional[JudgeCache] = None
+_judge_cache_lock = threading.Lock()
+
+
+def get_judge_cache() -> JudgeCache:
+    """Process-wide verdict cache, opened on first use"""
+    global _judge_cache
+    with _judge_cache_lock:
+        if _judge_cache is None:
+            _judge_cache = JudgeCache()
+    return _judge_cache
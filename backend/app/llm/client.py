@@ -0,0 +1,234 @@
+import os
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+import httpx
+from groq import AsyncGroq, APIStatusError, APIConnectionError, APITimeoutError
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Groq free-tier defaults; 0 disables a limit
+REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+MAX_CONNECTIONS = int(os.getenv("GROQ_MAX_CONNECTIONS", "16"))
+MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "4"))
+
+
+class LLMError(Exception):
+    """Raised when a chat completion still fails after all retries"""
+
+
+class TokenBucket:
+    """Async token bucket refilled continuously at ``per_minute`` units"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount: float):
+        # Requests bigger than the whole bucket wait for a full bucket
+        amount = min(amount, self.capacity)
+        async with self._lock:
+            while True:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+    def adjust(self, delta: float):
+        """Charge (or refund) the difference once real usage is known"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    """Rough prompt size (4 chars per token) plus the completion budget"""
+    return sum(len(m["content"]) for m in messages) // 4 + max_tokens
+
+
+class LLMClient:
+    """Shared async Groq client with one connection pool for the process.
+
+    Calls are rate-limited by request and token buckets, retried with
+    exponential backoff on 429/5xx/connection errors, and timed. The client
+    lives on its own event loop thread, so synchronous callers (the pipeline
+    thread pool) use ``complete`` and async callers use ``acomplete``.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        requests_per_minute: int = REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = TOKENS_PER_MINUTE,
+        max_connections: int = MAX_CONNECTIONS,
+        max_retries: int = MAX_RETRIES,
+        timeout: float = 60.0,
+    ):
+        self.max_retries = max_retries
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client", daemon=True)
+        self._thread.start()
+
+        async def setup():
+            # Everything bound to the loop is created on the loop
+            self.client = AsyncGroq(
+                api_key=api_key or os.getenv("GROQ_API_KEY"),
+                base_url=base_url,
+                max_retries=0,
+                http_client=httpx.AsyncClient(
+                    timeout=timeout,
+                    limits=httpx.Limits(
+                        max_connections=max_connections,
+                        max_keepalive_connections=max_connections,
+                    ),
+                ),
+            )
+            self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+            self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+        asyncio.run_coroutine_threadsafe(setup(), self._loop).result()
+
+        self._stats_lock = threading.Lock()
+        self._latencies = deque(maxlen=1000)
+        self.calls = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.failures = 0
+
+    async def _create(self, messages: List[Dict], model: str, temperature: float, max_tokens: int):
+        estimate = estimate_tokens(messages, max_tokens)
+
+        for attempt in range(self.max_retries + 1):
+            if self.request_bucket:
+                await self.request_bucket.acquire(1)
+            if self.token_bucket:
+                await self.token_bucket.acquire(estimate)
+
+            start = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    messages=messages,
+                    model=model,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                )
+            except (APIStatusError, APIConnectionError, APITimeoutError) as e:
+                status = getattr(e, "status_code", None)
+                retryable = status is None or status == 429 or status >= 500
+                if status == 429:
+                    with self._stats_lock:
+                        self.rate_limited += 1
+                if not retryable or attempt == self.max_retries:
+                    with self._stats_lock:
+                        self.failures += 1
+                    raise LLMError(f"Chat completion failed after {attempt + 1} attempts: {e}") from e
+
+                with self._stats_lock:
+                    self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, e))
+                continue
+
+            latency = time.perf_counter() - start
+            with self._stats_lock:
+                self.calls += 1
+                self._latencies.append(latency)
+
+            usage = getattr(response, "usage", None)
+            if self.token_bucket and usage is not None:
+                self.token_bucket.adjust(usage.total_tokens - estimate)
+
+            return response
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """Seconds to wait: Retry-After if the server sent one, else exponential"""
+        response = getattr(error, "response", None)
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            if retry_after:
+                try:
+                    return float(retry_after)
+                except ValueError:
+                    pass
+        return min(20.0, 0.5 * 2 ** attempt) * (1 + random.random() * 0.25)
+
+    async def acomplete(self, messages: List[Dict], model: str, temperature: float = 0, max_tokens: int = 500):
+        """Awaitable chat completion, usable from any event loop"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._create(messages, model, temperature, max_tokens), self._loop
+        )
+        return await asyncio.wrap_future(future)
+
+    def complete(self, messages: List[Dict], model: str, temperature: float = 0, max_tokens: int = 500):
+        """Blocking chat completion for synchronous callers"""
+        future = asyncio.run_coroutine_threadsafe(
+            self._create(messages, model, temperature, max_tokens), self._loop
+        )
+        return future.result()
+
+    def stats(self) -> Dict:
+        """Call counts and latency percentiles over the last 1000 calls"""
+        with self._stats_lock:
+            latencies = sorted(self._latencies)
+            stats = {
+                "calls": self.calls,
+                "retries": self.retries,
+                "rate_limited": self.rate_limited,
+                "failures": self.failures,
+            }
+
+        if latencies:
+            def pct(p):
+                return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 4)
+
+            stats.update({
+                "latency_mean": round(sum(latencies) / len(latencies), 4),
+                "latency_p50": pct(0.50),
+                "latency_p95": pct(0.95),
+                "latency_p99": pct(0.99),
+            })
+        return stats
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.client.close(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+_llm_client: Optional[LLMClient] = None
+_llm_lock = threading.Lock()
+
+
+def get_llm_client() -> LLMClient:
+    """Process-wide LLM client, created on first use"""
+    global _llm_client
+    with _llm_lock:
+        if _llm_client is None:
+            _llm_client = LLMClient()
+    return _llm_client
+
+
+def set_llm_client(client: Optional[LLMClient]) -> Optional[LLMClient]:
+    """Replace the process-wide client (e.g. one pointed at a local server)
+    for pipelines and judges created afterwards; returns the previous one"""
+    global _llm_client
+    with _llm_lock:
+        previous, _llm_client = _llm_client, client
+    return previous
+
+
+def llm_client_stats() -> Optional[Dict]:
+    """Stats of the shared client, or None if it was never used"""
+    return _llm_client.stats() if _llm_client is not None else None
@@ -0,0 +1,84 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+
+def generation_key(model: str, system_prompt: str, prompt: str, temperature: float, max_tokens: int) -> str:
+    """Hash of everything that determines a completion"""
+    prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+    payload = json.dumps([model, system_prompt, prompt_hash, temperature, max_tokens])
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationCache:
+    """LRU cache of completions with single-flight coalescing.
+
+    Each value is a generation dict, ``{"answer": ..., "tokens": ...}``,
+    so a cached answer keeps the usage of the call that made it. When
+    several threads ask for the same key at once, only the first one calls
+    the LLM; the rest wait on its result. Failures are not cached.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    def get_or_create(self, key: str, create: Callable[[], Dict]) -> Dict:
+        """The cached value for ``key``, calling ``create`` on a miss"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+
+            future: Optional[Future] = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            value = create()
+        except BaseException as e:
+            with self._lock:
+                self._inflight.pop(key, None)
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._inflight.pop(key, None)
+        future.set_result(value)
+        return value
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "entries": len(self._entries),
+        }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+generation_cache = GenerationCache()
@@ -1,20 +1,42 @@
 import os
-import shutil
+import json
+import time
+import uuid
+import hashlib
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional
 
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 
 from app.config import GROQ_API_KEY
 from app.models.schemas import (
+    AdaptiveEvaluationRequest,
+    AdaptiveEvaluationResponse,
     EvaluationRequest,
     EvaluationResponse,
     PipelineResult,
     EvaluationMetrics,
+    SweepRequest,
 )
-from app.pipelines.rag_engine import RAGComparator
+from app.pipelines.rag_engine import RAGComparator, MAX_CONCURRENCY, DEFAULT_PIPELINE_CONFIGS
+from app.pipelines.embeddings import EMBEDDER_MODELS, embedding_registry
+from app.pipelines.planner import ExecutionPlan, expand_grid
+from app.pipelines.reranker import reranker_registry
+from app.pipelines.ingest_jobs import ingest_jobs
+from app.pipelines.loaders import document_id
+from app.pipelines.manifest import read_pipeline_configs, write_pipeline_configs
+from app.pipelines.progress import IngestProgress
+from app.evaluators.adaptive import ADAPTIVE_MIN_QUESTIONS, SuccessiveHalving
 from app.evaluators.gpt_judge import GPTJudge
+from app.evaluators.judge_cache import get_judge_cache
+from app.llm.client import llm_client_stats
+from app.llm.generation_cache import generation_cache
+from app.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, metrics, observe_query_stage
 
 # --------------------------------------------------
 # FastAPI App
@@ -38,6 +60,45 @@ app.add_middleware(
 # --------------------------------------------------
 rag_comparator: Optional[RAGComparator] = None
 uploaded_files: List[str] = []
+# Configs new comparators are built with (replaced by a finished sweep)
+pipeline_configs: List[Dict] = list(DEFAULT_PIPELINE_CONFIGS.values())
+
+# Most pipelines one sweep may expand to
+MAX_SWEEP_PIPELINES = int(os.getenv("MAX_SWEEP_PIPELINES", "64"))
+
+# Upload bytes copied to disk per read
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+# --------------------------------------------------
+# Warm Start
+# --------------------------------------------------
+@app.on_event("startup")
+async def restore_corpus():
+    """Reattach the vector stores persisted by the previous run
+
+    Valid stores are ready at once; if some pipelines are stale the whole
+    comparator is swapped in by a background "restore" job once they are
+    rebuilt, so a half-restored set is never served. The pipelines are the
+    ones the last sweep saved, if any.
+    """
+    global rag_comparator, pipeline_configs
+
+    pipeline_configs = read_pipeline_configs() or pipeline_configs
+    comparator = RAGComparator(pipeline_configs)
+    report = await run_in_threadpool(comparator.restore)
+
+    if report["stale"]:
+        def work(progress):
+            global rag_comparator
+            result = comparator.rebuild_stale(progress)
+            # Don't clobber a corpus ingested while we were rebuilding
+            if rag_comparator is None:
+                rag_comparator = comparator
+            return result
+
+        ingest_jobs.submit("restore", comparator.restore_files(), list(comparator.indexes), work)
+    elif report["reattached"]:
+        rag_comparator = comparator
 
 # --------------------------------------------------
 # Health Check
@@ -48,6 +109,11 @@ async def root():
         "status": "healthy",
         "api_key_loaded": bool(GROQ_API_KEY),
         "pipelines_ready": rag_comparator is not None,
+        "embedding_models_loaded": embedding_registry.loaded_models(),
+        "llm_client": llm_client_stats(),
+        "judge_cache": get_judge_cache().stats(),
+        "generation_cache": generation_cache.stats(),
+        "rerankers": reranker_registry.stats(),
     }
 
 # --------------------------------------------------
@@ -62,29 +128,19 @@ async def upload_and_ingest(files: List[UploadFile] = File(...)):
         raise HTTPException(status_code=400, detail="No files uploaded")
     
     # Save files temporarily
-    upload_dir = "./data/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    file_paths = []
-    for file in files:
-        ext = os.path.splitext(file.filename)[1].lower()
-        if ext not in [".pdf", ".txt", ".docx"]:
-            raise HTTPException(status_code=400, detail=f"Unsupported: {ext}")
-        
-        file_path = os.path.join(upload_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-        file_paths.append(file_path)
+    file_paths = await save_uploads(files)
     
     try:
         print(f"📚 Processing {len(file_paths)} files...")
-        rag_comparator = RAGComparator()
-        rag_comparator.ingest_documents(file_paths)
+        # Runs in a worker thread so the event loop keeps serving requests
+        comparator, ingest_stats = await run_in_threadpool(replace_corpus, file_paths)
         
         return {
             "message": f"Successfully processed {len(file_paths)} files",
-            "pipelines": list(rag_comparator.pipelines.keys()),
-            "files": [os.path.basename(f) for f in file_paths]
+            "pipelines": list(comparator.pipelines.keys()),
+            "files": [os.path.basename(f) for f in file_paths],
+            "embedding_cache": ingest_stats["embedding_cache"],
+            "timings": ingest_stats["timings"],
         }
     
     except Exception as e:
@@ -101,22 +157,9 @@ async def upload_documents(files: List[UploadFile] = File(...)):
     if not files:
         raise HTTPException(status_code=400, detail="No files uploaded")
 
-    upload_dir = "./data/uploads"
-    if os.path.exists(upload_dir):
-        shutil.rmtree(upload_dir)
-    os.makedirs(upload_dir, exist_ok=True)
-    
-    uploaded_files = []
-
-    for file in files:
-        ext = os.path.splitext(file.filename)[1].lower()
-        if ext not in [".pdf", ".txt", ".docx"]:
-            raise HTTPException(status_code=400, detail=f"Unsupported: {ext}")
-
-        file_path = os.path.join(upload_dir, file.filename)
-        with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-        uploaded_files.append(file_path)
+    # The uploads directory also holds the indexed corpus's source files
+    # (see save_uploads), so earlier uploads are kept
+    uploaded_files = await save_uploads(files)
 
     return {
         "message": f"{len(uploaded_files)} files uploaded",
@@ -136,17 +179,159 @@ async def ingest_documents():
             raise HTTPException(status_code=400, detail="No documents available")
     
     try:
-        rag_comparator = RAGComparator()
-        rag_comparator.ingest_documents(uploaded_files)
+        comparator, ingest_stats = await run_in_threadpool(replace_corpus, uploaded_files)
         
         return {
             "message": "Documents ingested",
-            "pipelines": list(rag_comparator.pipelines.keys()),
-            "documents": [os.path.basename(f) for f in uploaded_files]
+            "pipelines": list(comparator.pipelines.keys()),
+            "documents": [os.path.basename(f) for f in uploaded_files],
+            "embedding_cache": ingest_stats["embedding_cache"],
+            "timings": ingest_stats["timings"],
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed: {str(e)}")
 
+# --------------------------------------------------
+# Incremental Documents (add/remove without a rebuild)
+# --------------------------------------------------
+@app.get("/documents")
+async def list_documents():
+    if not rag_comparator:
+        return {"documents": {}}
+    return {"documents": rag_comparator.documents}
+
+@app.post("/documents")
+async def add_documents(files: List[UploadFile] = File(...)):
+    """Add documents to the existing pipelines, creating them if needed"""
+    global rag_comparator
+
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    file_paths = await save_uploads(files)
+
+    try:
+        result = await run_in_threadpool(add_to_corpus, file_paths)
+
+        return {
+            "message": f"Added {len(result['added'])} documents",
+            "pipelines": list(rag_comparator.pipelines.keys()),
+            **result,
+        }
+    except Exception as e:
+        print(f"❌ Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Processing failed: {str(e)}")
+
+@app.delete("/documents/{doc_id}")
+async def remove_document(doc_id: str):
+    if not rag_comparator:
+        raise HTTPException(status_code=400, detail="Run /ingest first")
+
+    try:
+        return await run_in_threadpool(rag_comparator.remove_document, doc_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {doc_id}")
+
+# --------------------------------------------------
+# Background Ingestion Jobs
+# --------------------------------------------------
+@app.post("/jobs/ingest")
+async def submit_ingest_job(files: List[UploadFile] = File(...), mode: str = "replace"):
+    """Start ingesting in the background and return a job ID at once.
+
+    ``mode=replace`` builds a fresh corpus (like /upload-and-ingest);
+    ``mode=add`` adds the files to the current pipelines (like POST /documents).
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files uploaded")
+
+    if mode not in ("replace", "add"):
+        raise HTTPException(status_code=400, detail=f"Unsupported mode: {mode}")
+
+    file_paths = await save_uploads(files)
+    # Progress is tracked per index, the unit that is actually built
+    if mode == "add" and rag_comparator:
+        pipeline_names = list(rag_comparator.indexes)
+    else:
+        pipeline_names = list(ExecutionPlan(pipeline_configs).indexes)
+
+    if mode == "replace":
+        def work(progress):
+            comparator, ingest_stats = replace_corpus(file_paths, progress)
+            return {"pipelines": list(comparator.pipelines.keys()), **ingest_stats}
+    else:
+        def work(progress):
+            return add_to_corpus(file_paths, progress)
+
+    job = ingest_jobs.submit(mode, file_paths, pipeline_names, work)
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/jobs")
+async def list_ingest_jobs():
+    return {"jobs": [job.snapshot() for job in ingest_jobs.list()]}
+
+@app.get("/jobs/{job_id}")
+async def get_ingest_job(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.snapshot()
+
+@app.delete("/jobs/{job_id}")
+async def cancel_ingest_job(job_id: str):
+    job = ingest_jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job.snapshot()
+
+# --------------------------------------------------
+# Pipeline Sweeps
+# --------------------------------------------------
+@app.get("/pipelines")
+async def list_pipelines():
+    """Current pipeline configs and the artifacts they share"""
+    plan = rag_comparator.plan if rag_comparator else ExecutionPlan(pipeline_configs)
+    return {"pipelines": list(plan.configs.values()), "plan": plan.describe()}
+
+@app.post("/pipelines/sweep")
+async def sweep_pipelines(request: SweepRequest):
+    """Replace the pipelines with a grid of configs, re-ingesting the corpus
+
+    Runs as a background ingest job (see /jobs/{job_id}). Shared artifacts
+    are built once: one parse per file, one chunk set per
+    (chunk_size, overlap), one embedding per chunk set and embedder, one
+    index per distinct index config.
+    """
+    configs, skipped = [], 0
+    if request.grid:
+        configs, skipped = expand_grid(request.grid.model_dump())
+    if request.pipelines:
+        configs += [config.model_dump() for config in request.pipelines]
+
+    if not configs:
+        raise HTTPException(status_code=400, detail="The sweep has no valid pipelines")
+    if len(configs) > MAX_SWEEP_PIPELINES:
+        raise HTTPException(status_code=400, detail=f"{len(configs)} pipelines exceed MAX_SWEEP_PIPELINES={MAX_SWEEP_PIPELINES}")
+    unknown = sorted({config["embedder"] for config in configs} - set(EMBEDDER_MODELS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown embedders: {unknown}")
+
+    try:
+        plan = ExecutionPlan(configs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    file_paths = corpus_files()
+    if not file_paths:
+        raise HTTPException(status_code=400, detail="No documents available")
+
+    def work(progress):
+        comparator, ingest_stats = replace_corpus(file_paths, progress, configs)
+        return {"pipelines": list(comparator.pipelines.keys()), **ingest_stats}
+
+    job = ingest_jobs.submit("sweep", file_paths, list(plan.indexes), work)
+    return {"job_id": job.id, "status": job.status, "plan": plan.describe(skipped)}
+
 # --------------------------------------------------
 # Evaluate Pipelines
 # --------------------------------------------------
@@ -159,39 +344,12 @@ async def evaluate_pipelines(request: EvaluationRequest):
         raise HTTPException(status_code=400, detail="No questions provided")
 
     judge = GPTJudge()
+    max_concurrency = request.max_concurrency or MAX_CONCURRENCY
 
     print("\n🚀 Running evaluation...")
-    raw_results = rag_comparator.compare_pipelines(request.test_questions)
-
-    evaluated_results = []
-
-    for question, pipeline_outputs in raw_results.items():
-        question_result = {}
-
-        for pipeline_name, output in pipeline_outputs.items():
-            scores = judge.evaluate(
-                question=question,
-                answer=output["answer"],
-                context=output["context"],
-            )
-
-            metrics = EvaluationMetrics(
-                accuracy=scores["accuracy"],
-                relevance=scores["relevance"],
-                completeness=scores["completeness"],
-                reasoning=scores["reasoning"],
-                cost=output["cost"],
-            )
-
-            question_result[pipeline_name] = PipelineResult(
-                pipeline_name=pipeline_name,
-                answer=output["answer"],
-                retrieved_context=output["context"],
-                metrics=metrics,
-                processing_time=output["processing_time"],
-            )
-
-        evaluated_results.append(question_result)
+    evaluated_results = await run_in_threadpool(
+        run_evaluation, rag_comparator, judge, request.test_questions, max_concurrency, request.batch_judging
+    )
 
     winner, summary = calculate_winner(evaluated_results)
 
@@ -201,25 +359,295 @@ async def evaluate_pipelines(request: EvaluationRequest):
         summary=summary,
     )
 
+@app.post("/evaluate/adaptive", response_model=AdaptiveEvaluationResponse)
+async def evaluate_pipelines_adaptive(request: AdaptiveEvaluationRequest):
+    """Like /evaluate, but stop spending LLM calls on clearly losing pipelines
+
+    Pipelines are scored on growing question subsets (successive halving)
+    and dropped once their confidence interval falls below the leader's,
+    within an optional ``budget`` of LLM calls. The winner is picked among
+    the pipelines that answered every evaluated question; the summary
+    covers every pipeline over the questions it answered.
+    """
+    if not rag_comparator:
+        raise HTTPException(status_code=400, detail="Run /ingest first")
+
+    if not request.test_questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+
+    comparator = rag_comparator
+    judge = GPTJudge()
+    max_concurrency = request.max_concurrency or MAX_CONCURRENCY
+    questions = list(dict.fromkeys(request.test_questions))
+
+    def evaluate(batch: List[str], names: List[str]) -> List[Dict]:
+        return run_evaluation(comparator, judge, batch, max_concurrency, request.batch_judging, names)
+
+    halving = SuccessiveHalving(
+        list(comparator.pipelines),
+        batch_judging=request.batch_judging,
+        budget=request.budget,
+        min_questions=request.min_questions or ADAPTIVE_MIN_QUESTIONS,
+        confidence=request.confidence,
+    )
+
+    print("\n🚀 Running adaptive evaluation...")
+    report = await run_in_threadpool(halving.run, questions, evaluate)
+    if not report["results"]:
+        raise HTTPException(status_code=400, detail=f"A budget of {request.budget} LLM calls does not cover one question")
+
+    survivors = set(report.pop("survivors"))
+    winner, _ = calculate_winner([
+        {name: result for name, result in question.items() if name in survivors}
+        for question in report["results"]
+    ])
+    _, summary = calculate_winner(report["results"])
+    print(f"💰 {report['llm_calls']} LLM calls, {report['saved_llm_calls']} saved vs. {report['exhaustive_llm_calls']}")
+
+    return AdaptiveEvaluationResponse(winner=winner, summary=summary, **report)
+
+@app.post("/evaluate/stream")
+async def evaluate_pipelines_stream(request: EvaluationRequest, format: str = "ndjson"):
+    """Stream each PipelineResult as soon as it is judged, then the winner.
+
+    ``format=ndjson`` emits one JSON object per line; ``format=sse`` emits
+    Server-Sent Events. Every event has an ``event`` field: ``result`` for
+    a judged answer and a final ``summary`` with winner and summary.
+    """
+    if not rag_comparator:
+        raise HTTPException(status_code=400, detail="Run /ingest first")
+
+    if not request.test_questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+
+    if format not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+
+    comparator = rag_comparator
+    judge = GPTJudge()
+    max_concurrency = request.max_concurrency or MAX_CONCURRENCY
+
+    def encode(payload: Dict) -> str:
+        if format == "sse":
+            return f"event: {payload['event']}\ndata: {json.dumps(payload)}\n\n"
+        return json.dumps(payload) + "\n"
+
+    async def events():
+        # Embed and search every question in one batch per embedder first
+        retrieved = await run_in_threadpool(comparator.retrieve_all, request.test_questions)
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=max_concurrency)
+
+        async def run_question(index: int, question: str):
+            # Queries and judging share one bounded pool
+            answers = await asyncio.gather(*(
+                loop.run_in_executor(executor, comparator.query_pipeline, question, name, retrieved[question][name])
+                for name in comparator.pipelines
+            ))
+            outputs = dict(zip(comparator.pipelines, answers))
+            question_result = await loop.run_in_executor(
+                executor, judge_question, judge, question, outputs, request.batch_judging
+            )
+            return index, question, question_result
+
+        tasks = [
+            asyncio.ensure_future(run_question(index, question))
+            for index, question in enumerate(request.test_questions)
+        ]
+
+        # Only running totals are kept, not the results themselves
+        scores = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, question, question_result = await next_done
+                accumulate_scores(scores, question_result)
+                for result in question_result.values():
+                    yield encode({
+                        "event": "result",
+                        "question_index": index,
+                        "question": question,
+                        "result": result.model_dump(),
+                    })
+
+            winner, summary = summarize_scores(scores)
+            yield encode({"event": "summary", "winner": winner, "summary": summary})
+        finally:
+            # Client went away or we finished: drop whatever is still queued
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    media_type = "text/event-stream" if format == "sse" else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type)
+
 # --------------------------------------------------
 # Helper
 # --------------------------------------------------
-def calculate_winner(results: List[Dict]) -> tuple:
-    scores = {}
+async def save_uploads(files: List[UploadFile], upload_dir: str = "./data/uploads") -> List[str]:
+    """Validate extensions and stream uploads to disk, returning their paths
+
+    Files are copied in UPLOAD_CHUNK_BYTES pieces with the disk writes in a
+    worker thread, so big uploads neither sit in memory nor block the loop.
+    Each file is stored as ``<doc_id>/<filename>``, so an upload with the
+    same name but other content never overwrites an indexed source file.
+    """
+    for file in files:
+        ext = os.path.splitext(file.filename)[1].lower()
+        if ext not in [".pdf", ".txt", ".docx"]:
+            raise HTTPException(status_code=400, detail=f"Unsupported: {ext}")
 
-    for question in results:
-        for name, result in question.items():
-            scores.setdefault(
-                name,
-                {"acc": 0, "rel": 0, "comp": 0, "cost": 0, "count": 0},
+    os.makedirs(upload_dir, exist_ok=True)
+
+    file_paths = []
+    for file in files:
+        temp_path = os.path.join(upload_dir, f".{uuid.uuid4().hex}.part")
+        digest = hashlib.sha256()
+        try:
+            with open(temp_path, "wb") as buffer:
+                while True:
+                    data = await file.read(UPLOAD_CHUNK_BYTES)
+                    if not data:
+                        break
+                    digest.update(data)
+                    await run_in_threadpool(buffer.write, data)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        # Same content under the same name lands on the same path
+        file_dir = os.path.join(upload_dir, document_id(digest.hexdigest()))
+        os.makedirs(file_dir, exist_ok=True)
+        file_path = os.path.join(file_dir, os.path.basename(file.filename))
+        os.replace(temp_path, file_path)
+        file_paths.append(file_path)
+
+    return file_paths
+
+def corpus_files() -> List[str]:
+    """Source files of the current corpus (else the last upload)"""
+    if rag_comparator:
+        sources = {
+            info["source"]
+            for pipeline in rag_comparator.indexes.values()
+            for info in pipeline.document_files.values()
+        }
+        files = sorted(source for source in sources if source and os.path.exists(source))
+        if files:
+            return files
+    return list(uploaded_files)
+
+def replace_corpus(file_paths: List[str], progress: Optional[IngestProgress] = None, configs: Optional[List[Dict]] = None) -> tuple:
+    """Build a fresh comparator and swap it in once it is fully ingested
+
+    ``configs`` (e.g. from a sweep) become the pipelines from then on,
+    also after a restart.
+    """
+    global rag_comparator, pipeline_configs
+
+    comparator = RAGComparator(configs or pipeline_configs)
+    ingest_stats = comparator.ingest_documents(file_paths, progress)
+    rag_comparator = comparator
+    if configs:
+        pipeline_configs = configs
+        write_pipeline_configs(configs)
+    return comparator, ingest_stats
+
+def add_to_corpus(file_paths: List[str], progress: Optional[IngestProgress] = None) -> Dict:
+    """Add files to the current comparator, creating it if needed"""
+    global rag_comparator
+
+    if rag_comparator is None:
+        rag_comparator = RAGComparator(pipeline_configs)
+    return rag_comparator.add_documents(file_paths, progress)
+
+def run_evaluation(
+    comparator: RAGComparator,
+    judge: GPTJudge,
+    questions: List[str],
+    max_concurrency: int,
+    batch_judging: bool = True,
+    names: Optional[List[str]] = None,
+) -> List[Dict[str, PipelineResult]]:
+    """Answer and judge questions on every pipeline (or only ``names``)"""
+    raw_results = comparator.compare_pipelines(questions, max_concurrency=max_concurrency, names=names)
+
+    # Judge calls are independent network round-trips, so fan them out too
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(judge_question, judge, question, pipeline_outputs, batch_judging)
+            for question, pipeline_outputs in raw_results.items()
+        ]
+        return [future.result() for future in futures]
+
+def judge_question(judge: GPTJudge, question: str, pipeline_outputs: Dict, batch_judging: bool = True) -> Dict[str, PipelineResult]:
+    """Judge every pipeline's answer to one question"""
+    start = time.time()
+    if batch_judging:
+        # Batched judge calls score every pipeline's answer to this question
+        all_scores = judge.evaluate_batch(question, pipeline_outputs)
+    else:
+        all_scores = {
+            pipeline_name: judge.evaluate(
+                question=question,
+                answer=output["answer"],
+                context=output["context"],
             )
+            for pipeline_name, output in pipeline_outputs.items()
+        }
 
-            scores[name]["acc"] += result.metrics.accuracy
-            scores[name]["rel"] += result.metrics.relevance
-            scores[name]["comp"] += result.metrics.completeness
-            scores[name]["cost"] += result.metrics.cost
-            scores[name]["count"] += 1
+    # A batched verdict covers every answer, so each gets an equal share
+    judge_time = (time.time() - start) / max(1, len(pipeline_outputs))
+
+    question_result = {}
+    for pipeline_name, output in pipeline_outputs.items():
+        scores = all_scores[pipeline_name]
+        observe_query_stage("judge", judge_time, pipeline_name)
+
+        metrics = EvaluationMetrics(
+            accuracy=scores["accuracy"],
+            relevance=scores["relevance"],
+            completeness=scores["completeness"],
+            reasoning=scores["reasoning"],
+            cost=output["cost"],
+        )
+
+        question_result[pipeline_name] = PipelineResult(
+            pipeline_name=pipeline_name,
+            answer=output["answer"],
+            retrieved_context=output["context"],
+            metrics=metrics,
+            processing_time=output["processing_time"],
+            timings={**output.get("timings", {}), "judge": judge_time},
+            tokens=output.get("tokens", {}),
+        )
+
+    return question_result
 
+def calculate_winner(results: List[Dict]) -> tuple:
+    scores = {}
+
+    for question in results:
+        accumulate_scores(scores, question)
+
+    return summarize_scores(scores)
+
+def accumulate_scores(scores: Dict, question: Dict):
+    """Add one question's results to the running per-pipeline totals"""
+    for name, result in question.items():
+        scores.setdefault(
+            name,
+            {"acc": 0, "rel": 0, "comp": 0, "cost": 0, "count": 0},
+        )
+
+        scores[name]["acc"] += result.metrics.accuracy
+        scores[name]["rel"] += result.metrics.relevance
+        scores[name]["comp"] += result.metrics.completeness
+        scores[name]["cost"] += result.metrics.cost
+        scores[name]["count"] += 1
+
+def summarize_scores(scores: Dict) -> tuple:
+    """Turn running totals into (winner, summary)"""
     summary = {}
     winner = None
     best_score = -1
@@ -242,9 +670,19 @@ def calculate_winner(results: List[Dict]) -> tuple:
 
     return winner, summary
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms and token counters for Prometheus"""
+    return Response(content=metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/status")
 async def status():
     return {
         "documents_uploaded": len(uploaded_files),
         "pipelines_ready": rag_comparator is not None,
+        "embedding_models_loaded": embedding_registry.loaded_models(),
+        "llm_client": llm_client_stats(),
+        "judge_cache": get_judge_cache().stats(),
+        "generation_cache": generation_cache.stats(),
+        "rerankers": reranker_registry.stats(),
     }
\ No newline at end of file
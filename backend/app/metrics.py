@@ -0,0 +1,173 @@
+import math
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Seconds; wide enough for a page parse as well as a whole ingest
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, as Prometheus expects"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # label values -> (per-bucket counts, sum)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Optional[Sequence[float]] = None) -> Histogram:
+        return self._register(Histogram(name, help, labelnames, buckets or DEFAULT_BUCKETS))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+INGEST_STAGE_SECONDS = metrics.histogram(
+    "rag_ingest_stage_seconds",
+    "Time one ingest spent per stage (load, chunk, embed, index)",
+    ["stage", "pipeline"],
+)
+QUERY_STAGE_SECONDS = metrics.histogram(
+    "rag_query_stage_seconds",
+    "Time one answer spent per stage (embed, retrieve, rerank, pack, generate, judge)",
+    ["stage", "pipeline"],
+)
+LLM_TOKENS = metrics.counter(
+    "rag_llm_tokens_total",
+    "Tokens reported by the LLM API, by stage and kind (prompt or completion)",
+    ["stage", "kind"],
+)
+EMBEDDING_TOKENS = metrics.counter(
+    "rag_embedding_tokens_total",
+    "Tokens of ingested chunks, counted with each embedder's tokenizer",
+    ["pipeline"],
+)
+RERANK_TRUNCATED = metrics.counter(
+    "rag_rerank_truncated_total",
+    "Answers whose reranking stopped at the latency budget",
+    ["pipeline"],
+)
+
+
+def observe_ingest_stage(stage: str, seconds: float, pipeline: str = "all"):
+    """Record one ingest's time in a stage"""
+    INGEST_STAGE_SECONDS.observe(seconds, stage=stage, pipeline=pipeline)
+
+
+def observe_query_stage(stage: str, seconds: float, pipeline: str):
+    """Record one answer's time in a stage"""
+    QUERY_STAGE_SECONDS.observe(seconds, stage=stage, pipeline=pipeline)
+
+
+def record_llm_usage(stage: str, usage) -> Dict[str, int]:
+    """Count a completion's reported usage; returns prompt/completion tokens"""
+    tokens = {
+        "prompt": getattr(usage, "prompt_tokens", 0) or 0,
+        "completion": getattr(usage, "completion_tokens", 0) or 0,
+    }
+    for kind, count in tokens.items():
+        LLM_TOKENS.inc(count, stage=stage, kind=kind)
+    return tokens
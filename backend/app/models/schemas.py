@@ -1,12 +1,79 @@
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from pydantic import BaseModel, Field, NonNegativeInt, PositiveInt, model_validator
+from typing import List, Literal, Optional, Dict
+
+# Settings each approximate index type takes: IVF on the numpy store,
+# HNSW on Chroma
+ANN_SETTINGS = {
+    "ivf": ("nlist", "nprobe", "train_iterations"),
+    "hnsw": ("space", "M", "construction_ef", "search_ef"),
+}
+
+def check_vector_store(config):
+    """Reject quantization and ANN settings the chosen backend cannot apply"""
+    if config.quantization and config.vector_store != "numpy":
+        raise ValueError("Quantized storage requires the numpy vector store")
+    if config.ann:
+        ann_type = config.ann.get("type", "ivf" if config.vector_store == "numpy" else None)
+        expected = "ivf" if config.vector_store == "numpy" else "hnsw"
+        if ann_type != expected:
+            raise ValueError(f"The {config.vector_store} vector store only supports {expected} ANN, not {ann_type}")
+        unknown = sorted(set(config.ann) - {"type", *ANN_SETTINGS[expected]})
+        if unknown:
+            raise ValueError(f"Unknown {expected} settings: {unknown}")
+        for key, value in config.ann.items():
+            if key not in ("type", "space") and (not isinstance(value, int) or value < 1):
+                raise ValueError(f"ann.{key} must be a positive integer")
+    return config
 
 class PipelineConfig(BaseModel):
     name: str
-    chunk_size: int
-    overlap: int
+    chunk_size: int = Field(..., gt=0)
+    overlap: int = Field(..., ge=0)
     embedder: str
+    # Cross-encoder (e.g. "ms-marco-MiniLM-L-6-v2" or a HuggingFace model ID)
     reranker: Optional[str] = None
+    # Chunks retrieved per question (default RETRIEVAL_K)
+    k: Optional[int] = Field(None, ge=1)
+    # Candidates a reranker chooses the k best from (default RERANK_CANDIDATES)
+    rerank_candidates: Optional[int] = Field(None, ge=1)
+    # Most context tokens per prompt (default CONTEXT_TOKEN_BUDGET)
+    context_tokens: Optional[int] = Field(None, ge=1)
+    vector_store: Literal["chroma", "numpy"] = "chroma"
+    quantization: Optional[Literal["int8", "float16"]] = None
+    rescore: bool = True
+    # {"type": "ivf" | "hnsw", ...}, see ANN_SETTINGS
+    ann: Optional[Dict] = None
+
+    _check_vector_store = model_validator(mode="after")(check_vector_store)
+
+    @model_validator(mode="after")
+    def _check_overlap(self):
+        # A grid just skips these combinations (see expand_grid)
+        if self.overlap >= self.chunk_size:
+            raise ValueError("overlap must be smaller than chunk_size")
+        return self
+
+class SweepGrid(BaseModel):
+    """Every combination of these values becomes one pipeline"""
+    chunk_sizes: List[PositiveInt] = Field(..., min_length=1)
+    overlaps: List[NonNegativeInt] = Field(..., min_length=1)
+    embedders: List[str] = Field(..., min_length=1)
+    k: List[Optional[PositiveInt]] = [None]
+    rerankers: List[Optional[str]] = [None]
+    rerank_candidates: Optional[int] = Field(None, ge=1)
+    context_tokens: Optional[int] = Field(None, ge=1)
+    vector_store: Literal["chroma", "numpy"] = "chroma"
+    quantization: Optional[Literal["int8", "float16"]] = None
+    rescore: bool = True
+    # {"type": "ivf" | "hnsw", ...}, see ANN_SETTINGS
+    ann: Optional[Dict] = None
+
+    _check_vector_store = model_validator(mode="after")(check_vector_store)
+
+class SweepRequest(BaseModel):
+    """A grid to expand, explicit configs, or both"""
+    grid: Optional[SweepGrid] = None
+    pipelines: Optional[List[PipelineConfig]] = None
 
 class EvaluationMetrics(BaseModel):
     accuracy: float
@@ -21,11 +88,34 @@ class PipelineResult(BaseModel):
     retrieved_context: List[str]
     metrics: EvaluationMetrics
     processing_time: float
+    # Seconds per stage: embed, retrieve, rerank, pack, generate, judge
+    timings: Dict[str, float] = Field(default_factory=dict)
+    # Generation usage reported by the API: prompt, completion
+    tokens: Dict[str, int] = Field(default_factory=dict)
 
 class EvaluationRequest(BaseModel):
     test_questions: List[str]
+    max_concurrency: Optional[int] = Field(None, ge=1)
+    batch_judging: bool = True
 
 class EvaluationResponse(BaseModel):
     results: List[Dict[str, PipelineResult]]
     winner: str
-    summary: Dict[str, Dict[str, float]]
\ No newline at end of file
+    summary: Dict[str, Dict[str, float]]
+
+class AdaptiveEvaluationRequest(EvaluationRequest):
+    # Most generation + judge calls to spend (default: no limit)
+    budget: Optional[int] = Field(None, ge=1)
+    # Questions in the first round (default ADAPTIVE_MIN_QUESTIONS)
+    min_questions: Optional[int] = Field(None, ge=2)
+    confidence: float = Field(0.95, gt=0, lt=1)
+
+class AdaptiveEvaluationResponse(EvaluationResponse):
+    rounds: List[Dict]
+    # Pipeline -> round, questions answered and reason (confidence or budget)
+    eliminated: Dict[str, Dict]
+    questions_evaluated: int
+    budget_exhausted: bool
+    llm_calls: int
+    exhaustive_llm_calls: int
+    saved_llm_calls: int
@@ -0,0 +1,151 @@
+import copy
+from array import array
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+from langchain.schema import Document
+
+# Same order RecursiveCharacterTextSplitter is configured with
+CHUNK_SEPARATORS = ["\n\n", "\n", " ", ""]
+
+Span = Tuple[int, int]
+
+
+class ChunkSpan(NamedTuple):
+    """A chunk as offsets into its page's text, materialized on demand"""
+    page: Document
+    start: int
+    end: int
+
+    @property
+    def doc_id(self) -> Optional[str]:
+        return self.page.metadata.get('doc_id')
+
+    def text(self) -> str:
+        return self.page.page_content[self.start:self.end]
+
+    def materialize(self) -> Document:
+        """The chunk as a Document, as the splitter would create it
+
+        ``start_index`` is relative to whatever the page's own
+        ``start_index`` is relative to (a text block's is its file offset).
+        """
+        metadata = copy.deepcopy(self.page.metadata)
+        metadata['start_index'] = metadata.get('start_index', 0) + self.start
+        return Document(page_content=self.text(), metadata=metadata)
+
+
+class MultiConfigChunker:
+    """Chunk a text for several (chunk_size, overlap) configs in one pass.
+
+    Produces exactly the chunks of RecursiveCharacterTextSplitter (with
+    keep_separator and strip_whitespace, its defaults) for each config,
+    but as (start, end) offsets. Separator splits don't depend on the
+    chunk size, so each piece of the text is searched and split once and
+    the result shared by every config; only the cheap merge step runs per
+    config, and no intermediate strings are created.
+    """
+
+    def __init__(self, configs: List[Tuple[int, int]], separators: Optional[List[str]] = None):
+        self.configs = [(int(size), int(overlap)) for size, overlap in configs]
+        self.separators = separators or CHUNK_SEPARATORS
+
+    def split_spans(self, text: str) -> List[List[Span]]:
+        """Chunk offsets into ``text``, one list per config (in order)"""
+        splits: Dict[Tuple[int, int, int], Tuple[Sequence[int], Optional[int]]] = {}
+        results: Dict[Tuple[int, int], List[Span]] = {}
+        for config in self.configs:
+            if config not in results:
+                spans: List[Span] = []
+                self._split(text, 0, len(text), 0, config, splits, spans)
+                results[config] = spans
+        return [results[config] for config in self.configs]
+
+    def chunk(self, page: Document) -> List[List[ChunkSpan]]:
+        """ChunkSpans of one page, one list per config"""
+        return [
+            [ChunkSpan(page, start, end) for start, end in spans]
+            for spans in self.split_spans(page.page_content)
+        ]
+
+    def _pieces(self, text: str, start: int, end: int, level: int) -> Tuple[Sequence[int], Optional[int]]:
+        """Split text[start:end] on the first of separators[level:] it contains.
+
+        Pieces are contiguous, so they are returned as their boundaries
+        (piece k is bounds[k]:bounds[k + 1]); each separator stays attached
+        to the piece it starts, like keep_separator=True. Also returns the
+        separator level to split oversized pieces at (None when none left).
+        """
+        separators = self.separators[level:]
+        separator, next_level = separators[-1], None
+        for i, candidate in enumerate(separators):
+            if candidate == "":
+                separator = candidate
+                break
+            if text.find(candidate, start, end) != -1:
+                separator = candidate
+                if i + 1 < len(separators):
+                    next_level = level + i + 1
+                break
+
+        if separator == "":
+            return range(start, end + 1), next_level
+
+        bounds = array('q', [start])
+        position = text.find(separator, start, end)
+        while position != -1:
+            if position > start:
+                bounds.append(position)
+            position = text.find(separator, position + len(separator), end)
+        bounds.append(end)
+        return bounds, next_level
+
+    def _split(self, text: str, start: int, end: int, level: int, config: Tuple[int, int], splits: Dict, out: List[Span]):
+        key = (start, end, level)
+        if key not in splits:
+            splits[key] = self._pieces(text, start, end, level)
+        bounds, next_level = splits[key]
+
+        chunk_size = config[0]
+        good_from = 0
+        for k in range(len(bounds) - 1):
+            piece_start, piece_end = bounds[k], bounds[k + 1]
+            if piece_end - piece_start < chunk_size:
+                continue
+            # Pieces good_from..k-1 are a run of small ones to merge
+            if good_from < k:
+                self._merge(text, bounds, good_from, k, config, out)
+            good_from = k + 1
+            if next_level is None:
+                out.append((piece_start, piece_end))
+            else:
+                self._split(text, piece_start, piece_end, next_level, config, splits, out)
+        if good_from < len(bounds) - 1:
+            self._merge(text, bounds, good_from, len(bounds) - 1, config, out)
+
+    def _merge(self, text: str, bounds: Sequence[int], first: int, last: int, config: Tuple[int, int], out: List[Span]):
+        """Greedy merge of pieces first..last-1, as TextSplitter._merge_splits
+
+        Merged pieces are contiguous, so the window is just index bounds.
+        """
+        chunk_size, overlap = config
+        lo = first
+        total = 0
+        for k in range(first, last):
+            length = bounds[k + 1] - bounds[k]
+            if total + length > chunk_size and lo < k:
+                self._emit(text, bounds[lo], bounds[k], out)
+                while total > overlap or (total + length > chunk_size and total > 0):
+                    total -= bounds[lo + 1] - bounds[lo]
+                    lo += 1
+            total += length
+        if lo < last:
+            self._emit(text, bounds[lo], bounds[last], out)
+
+    @staticmethod
+    def _emit(text: str, start: int, end: int, out: List[Span]):
+        # strip_whitespace, without building the string
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            out.append((start, end))
@@ -0,0 +1,118 @@
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+from langchain.schema import Document
+
+# Most context tokens per prompt (a config's context_tokens overrides it)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+# HuggingFace tokenizer to count context tokens with, ideally the
+# generation model's; empty uses the pipeline's embedding tokenizer
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "")
+
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def context_token_counter() -> Optional[Callable[[str], int]]:
+    """Token counter for CONTEXT_TOKENIZER, or None when it isn't set or can't be loaded"""
+    global _tokenizer, _tokenizer_loaded
+    if not CONTEXT_TOKENIZER:
+        return None
+
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            try:
+                from transformers import AutoTokenizer
+                _tokenizer = AutoTokenizer.from_pretrained(CONTEXT_TOKENIZER)
+            except Exception as e:
+                print(f"⚠️  No tokenizer {CONTEXT_TOKENIZER} ({e}), counting context with the embedding tokenizer")
+            _tokenizer_loaded = True
+
+    if _tokenizer is None:
+        return None
+    return lambda text: len(_tokenizer(text, add_special_tokens=False)['input_ids'])
+
+
+def merge_chunks(docs: List[Document]) -> List[str]:
+    """Passages from ranked chunks, with overlapping text included once.
+
+    Chunks of the same page (doc_id and page) whose offsets overlap or
+    touch are merged into one passage, which takes the rank of its best
+    chunk. Chunks only merge when their text agrees where they overlap,
+    so offsets from different bases are never spliced together. Chunks
+    without offsets are only deduplicated by exact text.
+    Passages come out best-ranked first.
+    """
+    # (doc_id, page) -> [rank, start, end, text] of its merged spans
+    spans: Dict[tuple, List[List]] = {}
+    loose: Dict[str, int] = {}
+
+    for rank, doc in enumerate(docs):
+        metadata = doc.metadata or {}
+        start = metadata.get('start_index')
+        if metadata.get('doc_id') is None or start is None or start < 0:
+            loose.setdefault(doc.page_content, rank)
+            continue
+        spans.setdefault((metadata['doc_id'], metadata.get('page')), []).append(
+            [rank, start, start + len(doc.page_content), doc.page_content]
+        )
+
+    passages = [(rank, text) for text, rank in loose.items()]
+    for page_spans in spans.values():
+        page_spans.sort(key=lambda span: span[1])
+        merged = [page_spans[0]]
+        for rank, start, end, text in page_spans[1:]:
+            last = merged[-1]
+            overlap = min(last[2], end) - start
+            if start > last[2] or text[:overlap] != last[3][start - last[1]:start - last[1] + overlap]:
+                merged.append([rank, start, end, text])
+            elif end > last[2]:
+                last[3] += text[last[2] - start:]
+                last[2] = end
+                last[0] = min(last[0], rank)
+            else:
+                # Contained in the passage already
+                last[0] = min(last[0], rank)
+        passages.extend((rank, text) for rank, _, _, text in merged)
+
+    passages.sort(key=lambda passage: passage[0])
+    return [text for _, text in passages]
+
+
+def truncate_to_tokens(text: str, budget: int, count_tokens: Callable[[str], int]) -> str:
+    """The longest word prefix of ``text`` within ``budget`` tokens"""
+    words = text.split(' ')
+    low, high = 0, len(words)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if count_tokens(' '.join(words[:middle])) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return ' '.join(words[:low])
+
+
+def pack_context(docs: List[Document], count_tokens: Callable[[str], int], budget: Optional[int] = CONTEXT_TOKEN_BUDGET) -> List[str]:
+    """Merged passages, best first, filling at most ``budget`` tokens
+
+    The first passage that does not fit is cut at a word boundary to fill
+    what is left; everything after it is dropped. ``budget=None`` only
+    merges.
+    """
+    passages = merge_chunks(docs)
+    if budget is None:
+        return passages
+
+    packed, used = [], 0
+    for passage in passages:
+        tokens = count_tokens(passage)
+        if used + tokens <= budget:
+            packed.append(passage)
+            used += tokens
+            continue
+        remainder = truncate_to_tokens(passage, budget - used, count_tokens)
+        if remainder:
+            packed.append(remainder)
+        break
+    return packed
@@ -0,0 +1,222 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+
+from app.pipelines.embeddings import LazyEmbeddings, resolve_model_name
+
+EMBEDDING_CACHE_DIR = "./data/embedding_cache"
+
+
+def text_hash(text: str) -> str:
+    """Content address for a chunk of text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class EmbeddingCache:
+    """On-disk vectors for one model: a raw float array plus a hash index.
+
+    ``vectors.bin`` holds one row per cached chunk and is read through a
+    memory map; ``index.txt`` holds the matching chunk hashes, one per line,
+    each followed by a tab and the chunk's token count (lines written
+    before counts were kept have none). Both files are append-only, so a crash can only leave a torn tail,
+    which is trimmed on the next open.
+    """
+
+    def __init__(self, model_name: str, cache_dir: str = EMBEDDING_CACHE_DIR, dtype: str = "float32"):
+        self.model_name = model_name
+        self.directory = os.path.join(cache_dir, model_name.replace('/', '__'))
+        self.dtype = np.dtype(dtype)
+        self.dim: Optional[int] = None
+
+        self._vectors_path = os.path.join(self.directory, "vectors.bin")
+        self._index_path = os.path.join(self.directory, "index.txt")
+        self._meta_path = os.path.join(self.directory, "meta.json")
+
+        self._rows: Dict[str, int] = {}
+        self._tokens: Dict[str, int] = {}
+        self._vectors = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def _load(self):
+        if not os.path.exists(self._meta_path):
+            return
+
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        self.dim = meta['dim']
+        self.dtype = np.dtype(meta['dtype'])
+
+        lines = []
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                lines = [line.strip() for line in f if line.strip()]
+        hashes = [line.partition('\t')[0] for line in lines]
+
+        stored = 0
+        if os.path.exists(self._vectors_path):
+            stored = os.path.getsize(self._vectors_path) // self._row_bytes()
+
+        count = min(len(hashes), stored)
+        if count != len(hashes) or count != stored:
+            # Trim whatever a previous crash left half-written
+            with open(self._index_path, 'w') as f:
+                f.writelines(line + "\n" for line in lines[:count])
+            with open(self._vectors_path, 'r+b') as f:
+                f.truncate(count * self._row_bytes())
+
+        self._rows = {h: i for i, h in enumerate(hashes[:count])}
+        for line in lines[:count]:
+            h, _, tokens = line.partition('\t')
+            if tokens:
+                self._tokens[h] = int(tokens)
+
+    def _matrix(self):
+        if self._vectors is None and self._rows:
+            self._vectors = np.memmap(
+                self._vectors_path, dtype=self.dtype, mode='r',
+                shape=(len(self._rows), self.dim)
+            )
+        return self._vectors
+
+    def lookup(self, hashes: List[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for whichever hashes are present"""
+        with self._lock:
+            rows = {h: self._rows[h] for h in hashes if h in self._rows}
+            if not rows:
+                return {}
+            matrix = self._matrix()
+            return {h: np.asarray(matrix[row], dtype=np.float32) for h, row in rows.items()}
+
+    def token_counts(self, hashes: List[str]) -> Dict[str, int]:
+        """Return the cached token counts for whichever hashes have one"""
+        with self._lock:
+            return {h: self._tokens[h] for h in hashes if h in self._tokens}
+
+    def add(self, hashes: List[str], vectors: List[List[float]], tokens: Optional[List[int]] = None):
+        """Append new vectors (and their token counts); hashes already present are skipped"""
+        if not hashes:
+            return
+
+        with self._lock:
+            array = np.asarray(vectors, dtype=self.dtype)
+            if self.dim is None:
+                self.dim = array.shape[1]
+                with open(self._meta_path, 'w') as f:
+                    json.dump({"model": self.model_name, "dim": self.dim, "dtype": self.dtype.name}, f)
+
+            fresh = [i for i, h in enumerate(hashes) if h not in self._rows]
+            if not fresh:
+                return
+
+            with open(self._vectors_path, 'ab') as f:
+                f.write(np.ascontiguousarray(array[fresh]).tobytes())
+            with open(self._index_path, 'a') as f:
+                if tokens is None:
+                    f.writelines(hashes[i] + "\n" for i in fresh)
+                else:
+                    f.writelines(f"{hashes[i]}\t{tokens[i]}\n" for i in fresh)
+
+            for i in fresh:
+                self._rows[hashes[i]] = len(self._rows)
+                if tokens is not None:
+                    self._tokens[hashes[i]] = tokens[i]
+            self._vectors = None
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only computes vectors for unseen chunks"""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        # Ingest embeds batches from several threads
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_and_count(texts)[0]
+
+    def embed_and_count(self, texts: List[str]) -> Tuple[List[List[float]], int]:
+        """Vectors for ``texts`` and their total token count.
+
+        Token counts are cached with the vectors, so only chunks without
+        one (new, or cached before counts were kept) are tokenized.
+        """
+        hashes = [text_hash(text) for text in texts]
+        found = self.cache.lookup(hashes)
+        counts = self.cache.token_counts(hashes)
+
+        missing = {}
+        uncounted = {}
+        for h, text in zip(hashes, texts):
+            if h not in found and h not in missing:
+                missing[h] = text
+            if h not in counts and h not in uncounted:
+                uncounted[h] = text
+
+        if uncounted:
+            counts.update(zip(uncounted.keys(), self.embeddings.token_counts(list(uncounted.values()))))
+
+        if missing:
+            new_hashes = list(missing.keys())
+            new_vectors = self.embeddings.embed_documents(list(missing.values()))
+            self.cache.add(new_hashes, new_vectors, [counts[h] for h in new_hashes])
+            for h, vector in zip(new_hashes, new_vectors):
+                # Round-trip through the storage dtype so hits and misses agree
+                found[h] = np.asarray(vector, dtype=self.cache.dtype).astype(np.float32)
+
+        with self._lock:
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+
+        return [found[h].tolist() for h in hashes], sum(counts[h] for h in hashes)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Query vectors for many questions in one model call (not cached).
+
+        The sentence-transformers models used here embed queries and
+        documents the same way, so this matches ``embed_query`` per text.
+        """
+        return self.embeddings.embed_documents(texts)
+
+    def count_tokens(self, texts: List[str]) -> int:
+        """Token count of ``texts`` for this model (cache hits included)"""
+        return self.embeddings.count_tokens(texts)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {"hits": hits, "misses": misses, "cached_vectors": len(self.cache)}
+
+
+_cached_embeddings: Dict[str, CachedEmbeddings] = {}
+_cached_lock = threading.Lock()
+
+
+def get_cached_embeddings(embedder_name: str) -> CachedEmbeddings:
+    """Shared cache-backed embeddings for an embedder (one per model)"""
+    model_name = resolve_model_name(embedder_name)
+
+    with _cached_lock:
+        cached = _cached_embeddings.get(model_name)
+        if cached is None:
+            cached = CachedEmbeddings(LazyEmbeddings(embedder_name), EmbeddingCache(model_name))
+            _cached_embeddings[model_name] = cached
+    return cached
@@ -0,0 +1,118 @@
+import threading
+from typing import Dict, List, Optional
+from langchain.schema.embeddings import Embeddings
+from langchain_community.embeddings import HuggingFaceEmbeddings
+
+# Map the config's embedder names onto FREE sentence-transformers models
+EMBEDDER_MODELS = {
+    "text-embedding-3-large": "sentence-transformers/all-mpnet-base-v2",
+    "text-embedding-3-small": "sentence-transformers/all-MiniLM-L6-v2",
+}
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+
+def resolve_model_name(embedder_name: str) -> str:
+    """Translate a pipeline's embedder name into a HuggingFace model name"""
+    return EMBEDDER_MODELS.get(embedder_name, DEFAULT_EMBEDDING_MODEL)
+
+
+class EmbeddingRegistry:
+    """Process-wide cache so each embedding model is loaded only once"""
+
+    def __init__(self):
+        self._models: Dict[str, HuggingFaceEmbeddings] = {}
+        self._tokenizers: Dict[str, Optional[object]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, embedder_name: str) -> HuggingFaceEmbeddings:
+        """Return the shared embedding instance, loading it on first use"""
+        model_name = resolve_model_name(embedder_name)
+
+        embeddings = self._models.get(model_name)
+        if embeddings is not None:
+            return embeddings
+
+        with self._lock:
+            # Another thread may have finished loading while we waited
+            embeddings = self._models.get(model_name)
+            if embeddings is None:
+                embeddings = HuggingFaceEmbeddings(
+                    model_name=model_name,
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+                self._models[model_name] = embeddings
+                print(f"✓ Loaded embedding model {model_name}")
+
+        return embeddings
+
+    def tokenizer(self, embedder_name: str):
+        """The model's tokenizer, without loading the model if it isn't yet.
+
+        None when no tokenizer is available (e.g. offline), in which case
+        callers fall back to counting words.
+        """
+        model_name = resolve_model_name(embedder_name)
+
+        embeddings = self._models.get(model_name)
+        if embeddings is not None:
+            return getattr(getattr(embeddings, 'client', None), 'tokenizer', None)
+
+        with self._lock:
+            if model_name not in self._tokenizers:
+                try:
+                    from transformers import AutoTokenizer
+                    self._tokenizers[model_name] = AutoTokenizer.from_pretrained(model_name)
+                except Exception as e:
+                    print(f"⚠️  No tokenizer for {model_name} ({e}), counting words instead")
+                    self._tokenizers[model_name] = None
+        return self._tokenizers[model_name]
+
+    def register(self, embedder_name: str, embeddings: Embeddings):
+        """Serve a ready-made embeddings instance for an embedder's model
+        (e.g. a synthetic one for offline benchmarks)"""
+        with self._lock:
+            self._models[resolve_model_name(embedder_name)] = embeddings
+
+    def loaded_models(self) -> List[str]:
+        """Names of the models currently held in memory"""
+        return list(self._models.keys())
+
+    def clear(self):
+        """Drop all loaded models (mainly useful to free memory)"""
+        with self._lock:
+            self._models.clear()
+            self._tokenizers.clear()
+
+
+embedding_registry = EmbeddingRegistry()
+
+
+def get_embeddings(embedder_name: str) -> HuggingFaceEmbeddings:
+    """Shortcut for the process-wide registry"""
+    return embedding_registry.get(embedder_name)
+
+
+class LazyEmbeddings(Embeddings):
+    """Loads the shared model on first use, so pipelines can be created
+    (e.g. reattached to persisted stores at startup) without loading it"""
+
+    def __init__(self, embedder_name: str):
+        self.embedder_name = embedder_name
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return get_embeddings(self.embedder_name).embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return get_embeddings(self.embedder_name).embed_query(text)
+
+    def token_counts(self, texts: List[str]) -> List[int]:
+        """Tokens the model's tokenizer produces for each of ``texts``"""
+        tokenizer = embedding_registry.tokenizer(self.embedder_name)
+        if tokenizer is None:
+            return [len(text.split()) for text in texts]
+        return [len(ids) for ids in tokenizer(texts, add_special_tokens=True)['input_ids']]
+
+    def count_tokens(self, texts: List[str]) -> int:
+        """Tokens the model's tokenizer produces for ``texts``"""
+        return sum(self.token_counts(texts))
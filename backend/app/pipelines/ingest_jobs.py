@@ -0,0 +1,113 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from app.pipelines.progress import IngestCancelled, IngestProgress
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+
+
+class IngestJob:
+    """One background ingest and its outcome"""
+
+    def __init__(self, kind: str, files: List[str], pipeline_names: List[str]):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.files = [os.path.basename(f) for f in files]
+        self.status = "queued"
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.progress = IngestProgress(len(files), pipeline_names)
+        self.future = None
+
+    def snapshot(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "files": self.files,
+            "created": self.created,
+            "started": self.progress.started,
+            "finished": self.finished,
+            "progress": self.progress.snapshot(),
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class IngestJobManager:
+    """Runs ingests on a worker pool so request handlers return at once"""
+
+    def __init__(self, max_workers: int = INGEST_WORKERS, max_jobs: int = 100):
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest")
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        kind: str,
+        files: List[str],
+        pipeline_names: List[str],
+        work: Callable[[IngestProgress], Dict],
+    ) -> IngestJob:
+        """Queue ``work(progress)``; its return value becomes the job result"""
+        job = IngestJob(kind, files, pipeline_names)
+
+        def run():
+            if job.progress.cancelled:
+                job.status = "cancelled"
+                job.finished = time.time()
+                return
+            job.status = "running"
+            job.progress.start()
+            try:
+                job.result = work(job.progress)
+                job.status = "completed"
+            except IngestCancelled:
+                job.status = "cancelled"
+            except Exception as e:
+                print(f"❌ Ingest job {job.id} failed: {str(e)}")
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished = time.time()
+
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        job.future = self._executor.submit(run)
+        return job
+
+    def _prune(self):
+        # Forget the oldest finished jobs once we hold too many
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        while len(self._jobs) > self.max_jobs and finished:
+            self._jobs.pop(finished.pop(0))
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        """Cancel a queued job outright or ask a running one to stop"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        job.progress.cancel()
+        if job.future is not None and job.future.cancel():
+            job.status = "cancelled"
+            job.finished = time.time()
+        return job
+
+
+ingest_jobs = IngestJobManager()
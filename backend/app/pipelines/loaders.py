@@ -0,0 +1,332 @@
+import os
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from langchain_community.document_loaders import Docx2txtLoader
+from langchain.schema import Document
+
+from app.pipelines.progress import IngestCancelled, IngestProgress
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+# Rough ceiling on the document text an ingest holds in memory at once.
+# Text files are read in blocks of 1/32 of it (one block fans out into a
+# chunk list per pipeline), chunk buffers are flushed to the vector stores
+# at 1/2 and only files with up to one block of text are kept in the
+# document cache.
+INGEST_MEMORY_LIMIT_BYTES = int(os.getenv("INGEST_MEMORY_LIMIT_MB", "64")) * 1024 * 1024
+TEXT_BLOCK_CHARS = INGEST_MEMORY_LIMIT_BYTES // 32
+
+# Worker processes parsing PDF/DOCX files (1 parses in the calling thread)
+PARSE_WORKERS = int(os.getenv("PARSE_WORKERS", str(os.cpu_count() or 1)))
+# PDFs are parsed in page ranges of this size, in parallel when they're long
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "32"))
+
+
+def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_text_blocks(file_path: str, block_chars: int = TEXT_BLOCK_CHARS) -> Iterator[Document]:
+    """Read a text file as a sequence of Documents of at most ~block_chars
+    
+    Blocks end on a paragraph (or line) break where possible so chunking a
+    block matches chunking the whole file. Each block's ``start_index`` is
+    its offset in the file, so its chunks get file-relative offsets too.
+    """
+    with open(file_path, encoding='utf-8') as f:
+        buffer = ''
+        offset = 0
+        while True:
+            data = f.read(block_chars)
+            buffer += data
+            while len(buffer) > block_chars:
+                cut = buffer.rfind('\n\n', 0, block_chars)
+                if cut <= 0:
+                    cut = buffer.rfind('\n', 0, block_chars)
+                if cut <= 0:
+                    cut = block_chars
+                yield Document(page_content=buffer[:cut], metadata={'source': file_path, 'start_index': offset})
+                offset += cut
+                buffer = buffer[cut:]
+            if not data:
+                if buffer:
+                    yield Document(page_content=buffer, metadata={'source': file_path, 'start_index': offset})
+                return
+
+
+def parse_tasks(file_path: str) -> List[Tuple]:
+    """Split a PDF/DOCX file into independently parseable pieces
+    
+    A PDF becomes one (path, start, end) page range per PDF_PAGES_PER_TASK
+    pages; docx2txt has no incremental API, so a DOCX is one piece.
+    """
+    if file_path.endswith('.pdf'):
+        import pypdf
+        count = len(pypdf.PdfReader(file_path).pages)
+        return [(file_path, start, min(start + PDF_PAGES_PER_TASK, count)) for start in range(0, count, PDF_PAGES_PER_TASK)]
+    elif file_path.endswith('.docx'):
+        return [(file_path, None, None)]
+    raise ValueError(f"Unsupported file type: {file_path}")
+
+
+def parse_task(file_path: str, start: Optional[int] = None, end: Optional[int] = None) -> List[Document]:
+    """Parse one piece from parse_tasks (runs in a worker process)"""
+    if file_path.endswith('.pdf'):
+        import pypdf
+        reader = pypdf.PdfReader(file_path)
+        # Same content and metadata as PyPDFLoader
+        return [
+            Document(page_content=reader.pages[n].extract_text(), metadata={'source': file_path, 'page': n})
+            for n in range(start, end)
+        ]
+    elif file_path.endswith('.docx'):
+        return Docx2txtLoader(file_path).load()
+    raise ValueError(f"Unsupported file type: {file_path}")
+
+
+def lazy_pages(file_path: str) -> Iterator[Document]:
+    """Iterate a file's pages without materializing them all"""
+    if file_path.endswith('.txt'):
+        return iter_text_blocks(file_path)
+    return (page for task in parse_tasks(file_path) for page in parse_task(*task))
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared parser processes, started on first use (None if PARSE_WORKERS <= 1)"""
+    global _parse_pool
+    if PARSE_WORKERS <= 1:
+        return None
+
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            # Forking a process that runs threads (event loop, LLM client) is unsafe
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _parse_pool
+
+
+def _reset_parse_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died so the next ingest starts a new one"""
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def document_id(digest: str) -> str:
+    """Stable document ID derived from the file content hash"""
+    return digest[:16]
+
+
+def _copy_documents(documents: List[Document], file_path: str, digest: str) -> List[Document]:
+    """Fresh Document objects pointing at the given path"""
+    copies = []
+    for doc in documents:
+        metadata = dict(doc.metadata)
+        metadata['source'] = file_path
+        metadata['doc_id'] = document_id(digest)
+        metadata['file_hash'] = digest
+        copies.append(Document(page_content=doc.page_content, metadata=metadata))
+    return copies
+
+
+class DocumentCache:
+    """Parsed documents keyed by file content hash (LRU, in memory)"""
+
+    def __init__(self, max_files: int = 128):
+        self.max_files = max_files
+        self._entries: "OrderedDict[str, List[Document]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[List[Document]]:
+        with self._lock:
+            documents = self._entries.get(digest)
+            if documents is not None:
+                self._entries.move_to_end(digest)
+            return documents
+
+    def put(self, digest: str, documents: List[Document]):
+        with self._lock:
+            self._entries[digest] = documents
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_files:
+                self._entries.popitem(last=False)
+
+    def load(self, file_path: str) -> List[Document]:
+        """Parse a file, reusing an earlier parse of identical content"""
+        return list(self.iter_pages(file_path, file_hash(file_path)))
+
+    def iter_pages(self, file_path: str, digest: str, pages: Optional[Iterable[Document]] = None) -> Iterator[Document]:
+        """Yield a file's pages one at a time, reusing an earlier parse
+        
+        ``pages`` overrides how the file is parsed (e.g. by worker
+        processes). Only files with at most TEXT_BLOCK_CHARS characters of
+        text are kept for reuse, so a huge upload is never held in memory
+        as a whole; pages are dropped as soon as the text passes that.
+        """
+        cached = self.get(digest)
+        if cached is not None:
+            self.hits += 1
+            print(f"✓ Reused parsed {os.path.basename(file_path)} ({len(cached)} pages)")
+            yield from _copy_documents(cached, file_path, digest)
+            return
+
+        self.misses += 1
+        keep = True
+        kept = []
+        count = 0
+        chars = 0
+        for page in (lazy_pages(file_path) if pages is None else pages):
+            page = _copy_documents([page], file_path, digest)[0]
+            count += 1
+            chars += len(page.page_content)
+            if keep and chars > TEXT_BLOCK_CHARS:
+                keep = False
+                kept = []
+            if keep:
+                # Callers get their own copy; the cached one stays pristine
+                kept.append(page)
+                page = _copy_documents([page], file_path, digest)[0]
+            yield page
+
+        if keep:
+            self.put(digest, kept)
+        print(f"✓ Loaded {count} pages from {os.path.basename(file_path)}")
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+document_cache = DocumentCache()
+
+
+def iter_documents(
+    file_paths: List[str],
+    progress: Optional[IngestProgress] = None,
+    skip_ids: Optional[Set[str]] = None,
+    skipped: Optional[List[str]] = None,
+    failed: Optional[List[str]] = None,
+) -> Iterator[Document]:
+    """Stream the pages of every file, one at a time and in file order
+    
+    PDF page ranges and DOCX files are parsed ahead in the process pool
+    (at most 2 * PARSE_WORKERS pieces in flight) while text files are read
+    here. Files whose doc_id is in ``skip_ids`` or that repeat an earlier
+    file's content are not parsed (their IDs go to ``skipped``). A file
+    that fails to parse is reported and its doc_id appended to ``failed``;
+    pages it yielded before failing are the caller's to discard.
+    """
+    # Decide up front what to parse, so the pool can run ahead of us
+    files: List[Dict] = []
+    tasks: List[Tuple] = []
+    seen = set()
+    pool = get_parse_pool()
+    for file_path in file_paths:
+        entry = {"path": file_path, "first_task": len(tasks)}
+        files.append(entry)
+        if not file_path.endswith(SUPPORTED_EXTENSIONS):
+            continue
+
+        try:
+            entry["digest"] = file_hash(file_path)
+        except OSError as e:
+            entry["error"] = e
+            continue
+        doc_id = document_id(entry["digest"])
+        if doc_id in seen or (skip_ids is not None and doc_id in skip_ids):
+            entry["skip"] = True
+            continue
+        seen.add(doc_id)
+
+        if pool and not file_path.endswith('.txt') and document_cache.get(entry["digest"]) is None:
+            try:
+                pieces = parse_tasks(file_path)
+            except Exception as e:
+                entry["error"] = e
+                continue
+            entry["tasks"] = range(len(tasks), len(tasks) + len(pieces))
+            tasks.extend(pieces)
+
+    futures: Dict[int, Future] = {}
+    submitted = 0
+    lookahead = 2 * PARSE_WORKERS
+
+    def prefetch(upto: int):
+        nonlocal submitted
+        while submitted < min(upto, len(tasks)):
+            futures[submitted] = pool.submit(parse_task, *tasks[submitted])
+            submitted += 1
+
+    def pooled_pages(entry: Dict) -> Iterator[Document]:
+        for task in entry["tasks"]:
+            prefetch(task + lookahead)
+            yield from futures.pop(task).result()
+
+    try:
+        for entry in files:
+            file_path = entry["path"]
+            if progress:
+                progress.check_cancelled()
+            if pool:
+                prefetch(entry["first_task"] + lookahead)
+
+            if not file_path.endswith(SUPPORTED_EXTENSIONS):
+                print(f"Unsupported file type: {file_path}")
+            elif entry.get("skip"):
+                doc_id = document_id(entry["digest"])
+                if skipped is not None and doc_id not in skipped:
+                    skipped.append(doc_id)
+            else:
+                try:
+                    if "error" in entry:
+                        raise entry["error"]
+                    pages = pooled_pages(entry) if "tasks" in entry else None
+                    for page in document_cache.iter_pages(file_path, entry["digest"], pages):
+                        if progress:
+                            progress.check_cancelled()
+                        yield page
+                except IngestCancelled:
+                    raise
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        # A worker died (e.g. a crash inside the PDF parser)
+                        # and took this file with it; later files' pieces
+                        # are resubmitted to a fresh pool
+                        _reset_parse_pool(pool)
+                        pool = get_parse_pool()
+                        futures.clear()
+                        submitted = entry["tasks"].stop
+                    print(f"✗ Error loading {file_path}: {str(e)}")
+                    if failed is not None and "digest" in entry:
+                        failed.append(document_id(entry["digest"]))
+
+            if progress:
+                progress.file_parsed()
+    finally:
+        # Stopped early (cancelled or abandoned): drop the queued pieces
+        for future in futures.values():
+            future.cancel()
+
+
+def load_documents(file_paths: List[str], progress: Optional[IngestProgress] = None) -> List[Document]:
+    """Load documents from various file types, parsing each file only once"""
+    return list(iter_documents(file_paths, progress))
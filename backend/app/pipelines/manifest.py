@@ -0,0 +1,87 @@
+import os
+import json
+import time
+import shutil
+from typing import Dict, List, Optional
+
+# Root of every pipeline's persisted vector store
+VECTORDB_DIR = os.getenv("VECTORDB_DIR", "./data/vectordb")
+MANIFEST_FILE = "manifest.json"
+# The active pipeline configs (after a sweep), next to the pipelines' stores
+CONFIGS_FILE = "pipelines.json"
+MANIFEST_VERSION = 1
+
+# Config keys that change what ends up in a pipeline's index
+FINGERPRINT_KEYS = ("chunk_size", "overlap", "vector_store", "quantization", "rescore", "ann")
+
+
+def pipeline_fingerprint(config: Dict, embedding_model_name: str) -> Dict:
+    """The parts of a pipeline config a persisted store must match to be reused"""
+    fingerprint = {key: config.get(key) for key in FINGERPRINT_KEYS}
+    fingerprint["vector_store"] = fingerprint["vector_store"] or "chroma"
+    fingerprint["embedding_model"] = embedding_model_name
+    return fingerprint
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """The manifest in ``directory``, or None if missing/unreadable/outdated"""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable manifest {path}: {str(e)}")
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def write_manifest(directory: str, manifest: Dict):
+    """Atomically replace the manifest so a crash never leaves half of one"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({**manifest, "version": MANIFEST_VERSION, "updated": time.time()}, f)
+    os.replace(tmp_path, path)
+
+
+def read_pipeline_configs(directory: str = VECTORDB_DIR) -> Optional[List[Dict]]:
+    """The pipeline configs saved by the last sweep, or None if there are none"""
+    path = os.path.join(directory, CONFIGS_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            configs = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable pipeline configs {path}: {str(e)}")
+        return None
+    return configs or None
+
+
+def write_pipeline_configs(configs: List[Dict], directory: str = VECTORDB_DIR):
+    """Atomically save the active pipeline configs so a restart restores them"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, CONFIGS_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(configs, f)
+    os.replace(tmp_path, path)
+
+
+def prune_builds(directory: str, keep: tuple):
+    """Delete every build (and legacy file) under ``directory`` except ``keep``"""
+    if not os.path.isdir(directory):
+        return
+    for entry in os.listdir(directory):
+        if entry == MANIFEST_FILE or entry in keep:
+            continue
+        path = os.path.join(directory, entry)
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            os.remove(path)
@@ -0,0 +1,132 @@
+import json
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+from app.pipelines.embeddings import resolve_model_name
+from app.pipelines.manifest import pipeline_fingerprint
+
+# Config fields that only change how an index is searched, not its contents
+RETRIEVAL_KEYS = ("k", "reranker", "rerank_candidates", "context_tokens")
+
+ChunkKey = Tuple[int, int]
+EmbeddingKey = Tuple[int, int, str]
+
+
+def chunk_key(config: Dict) -> ChunkKey:
+    return (int(config['chunk_size']), int(config['overlap']))
+
+
+def embedding_key(config: Dict) -> EmbeddingKey:
+    return chunk_key(config) + (resolve_model_name(config['embedder']),)
+
+
+def index_key(config: Dict) -> str:
+    """Everything that determines an index's contents (same as its manifest fingerprint)"""
+    return json.dumps(pipeline_fingerprint(config, resolve_model_name(config['embedder'])), sort_keys=True)
+
+
+def embedding_set_name(key: EmbeddingKey) -> str:
+    chunk_size, overlap, model = key
+    return f"{chunk_size}-{overlap}-{model.split('/')[-1]}"
+
+
+def expand_grid(grid: Dict) -> Tuple[List[Dict], int]:
+    """Pipeline configs for every combination in a sweep grid
+
+    ``grid`` has lists ``chunk_sizes``, ``overlaps``, ``embedders``, ``k``
+    and ``rerankers``; any other key (vector_store, quantization, ...) is
+    copied into every config. Combinations whose overlap is not smaller
+    than the chunk size are skipped. Returns (configs, skipped count).
+    """
+    shared = {
+        key: value for key, value in grid.items()
+        if key not in ("chunk_sizes", "overlaps", "embedders", "k", "rerankers")
+    }
+    configs, skipped = [], 0
+    for chunk_size, overlap, embedder, k, reranker in itertools.product(
+        grid["chunk_sizes"], grid["overlaps"], grid["embedders"], grid.get("k") or [None], grid.get("rerankers") or [None]
+    ):
+        if overlap >= chunk_size:
+            skipped += 1
+            continue
+        name = f"cs{chunk_size}_ov{overlap}_{embedder}" + (f"_k{k}" if k else "") + (f"_{reranker}" if reranker else "")
+        configs.append({
+            **shared,
+            "name": name,
+            "chunk_size": chunk_size,
+            "overlap": overlap,
+            "embedder": embedder,
+            "k": k,
+            "reranker": reranker,
+        })
+    return configs, skipped
+
+
+class ExecutionPlan:
+    """The artifact DAG behind a set of pipeline configs.
+
+    parse (one per file) -> chunk set (one per chunk_size/overlap) ->
+    embedding set (one per chunk set and embedding model) -> index (one
+    per distinct index fingerprint) -> pipeline (k, reranker). Each node is
+    computed once and shared by everything downstream of it, so a sweep
+    costs one ingest per distinct artifact rather than one per config.
+    An index is named after the first pipeline that needs it, which owns
+    its store; the other pipelines on it only differ at query time.
+    """
+
+    def __init__(self, configs: List[Dict]):
+        self.configs: Dict[str, Dict] = {}
+        for config in configs:
+            if config['name'] in self.configs:
+                raise ValueError(f"Duplicate pipeline name: {config['name']}")
+            self.configs[config['name']] = config
+
+        # chunk set -> embedding sets built from it
+        self.chunk_sets: Dict[ChunkKey, List[EmbeddingKey]] = {}
+        # embedding set -> indexes built from it
+        self.embedding_sets: Dict[EmbeddingKey, List[str]] = {}
+        # index (owning pipeline) -> pipelines served by it
+        self.indexes: Dict[str, List[str]] = {}
+        # pipeline -> its index
+        self.index_of: Dict[str, str] = {}
+
+        owners: Dict[str, str] = {}
+        for name, config in self.configs.items():
+            key = index_key(config)
+            owner = owners.get(key)
+            if owner is None:
+                owner = owners[key] = name
+                self.indexes[owner] = []
+
+                embedding = embedding_key(config)
+                if embedding not in self.embedding_sets:
+                    self.embedding_sets[embedding] = []
+                    self.chunk_sets.setdefault(chunk_key(config), []).append(embedding)
+                self.embedding_sets[embedding].append(owner)
+
+            self.indexes[owner].append(name)
+            self.index_of[name] = owner
+
+    def summary(self) -> Dict[str, int]:
+        """Artifact counts (without planning, each would equal the pipeline count)"""
+        return {
+            "pipelines": len(self.configs),
+            "chunk_sets": len(self.chunk_sets),
+            "embedding_sets": len(self.embedding_sets),
+            "indexes": len(self.indexes),
+        }
+
+    def describe(self, skipped: Optional[int] = None) -> Dict:
+        """The DAG as plain data (for API responses)"""
+        description = {
+            "chunk_sets": [
+                {"chunk_size": size, "overlap": overlap, "embedding_sets": [embedding_set_name(e) for e in embeddings]}
+                for (size, overlap), embeddings in self.chunk_sets.items()
+            ],
+            "embedding_sets": {embedding_set_name(key): indexes for key, indexes in self.embedding_sets.items()},
+            "indexes": self.indexes,
+            "summary": self.summary(),
+        }
+        if skipped is not None:
+            description["summary"]["skipped_configs"] = skipped
+        return description
@@ -0,0 +1,88 @@
+import time
+import threading
+from typing import Dict, List, Optional
+
+
+class IngestCancelled(Exception):
+    """Raised inside an ingest when its job has been cancelled"""
+
+
+class IngestProgress:
+    """Thread-safe progress counters for one ingest run.
+
+    Parsing counts as one stage and each pipeline (chunk + embed) as one
+    more; the ETA extrapolates from the average completion of those stages.
+    """
+
+    def __init__(self, file_count: int, pipeline_names: List[str]):
+        self.files_total = file_count
+        self.files_parsed = 0
+        self.pipelines: Dict[str, Dict] = {name: self._new_pipeline() for name in pipeline_names}
+        self.started: Optional[float] = None
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_pipeline() -> Dict:
+        return {"status": "pending", "chunks_total": 0, "chunks_embedded": 0}
+
+    def start(self):
+        self.started = time.time()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def check_cancelled(self):
+        if self._cancelled.is_set():
+            raise IngestCancelled()
+
+    def file_parsed(self):
+        with self._lock:
+            self.files_parsed += 1
+
+    def chunks_created(self, name: str, count: int):
+        with self._lock:
+            pipeline = self.pipelines.setdefault(name, self._new_pipeline())
+            pipeline["status"] = "embedding"
+            pipeline["chunks_total"] += count
+
+    def chunks_embedded(self, name: str, count: int):
+        with self._lock:
+            self.pipelines[name]["chunks_embedded"] += count
+
+    def pipeline_done(self, name: str):
+        with self._lock:
+            self.pipelines.setdefault(name, self._new_pipeline())["status"] = "done"
+
+    def fraction(self) -> float:
+        """Overall completion between 0 and 1"""
+        with self._lock:
+            stages = [self.files_parsed / self.files_total if self.files_total else 1.0]
+            for pipeline in self.pipelines.values():
+                if pipeline["status"] == "done":
+                    stages.append(1.0)
+                elif pipeline["chunks_total"]:
+                    stages.append(pipeline["chunks_embedded"] / pipeline["chunks_total"])
+                else:
+                    stages.append(0.0)
+        return sum(stages) / len(stages)
+
+    def snapshot(self) -> Dict:
+        fraction = self.fraction()
+        eta = None
+        if self.started and 0 < fraction < 1:
+            elapsed = time.time() - self.started
+            eta = round(elapsed * (1 - fraction) / fraction, 1)
+
+        with self._lock:
+            return {
+                "files_total": self.files_total,
+                "files_parsed": self.files_parsed,
+                "pipelines": {name: dict(p) for name, p in self.pipelines.items()},
+                "fraction": round(fraction, 3),
+                "eta_seconds": eta,
+            }
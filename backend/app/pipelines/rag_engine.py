@@ -1,122 +1,337 @@
 import os
 import time
-import httpx
-from typing import List, Dict
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFLoader, Docx2txtLoader, TextLoader
+import uuid
+import weakref
+import threading
+import numpy as np
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from langchain.schema import Document
-from groq import Groq
 from dotenv import load_dotenv
 
+from app.pipelines.chunking import ChunkSpan, MultiConfigChunker
+from app.pipelines.context_packer import CONTEXT_TOKEN_BUDGET, context_token_counter, pack_context
+from app.pipelines.embeddings import resolve_model_name
+from app.pipelines.embedding_cache import get_cached_embeddings
+from app.pipelines.loaders import INGEST_MEMORY_LIMIT_BYTES, file_hash, iter_documents, load_documents
+from app.pipelines.manifest import MANIFEST_FILE, VECTORDB_DIR, pipeline_fingerprint, prune_builds, read_manifest, write_manifest
+from app.pipelines.planner import ExecutionPlan, embedding_key, embedding_set_name
+from app.pipelines.progress import IngestCancelled, IngestProgress
+from app.pipelines.reranker import RERANK_CANDIDATES, reranker_registry
+from app.pipelines.vectorstores import NumpyVectorStore, add_embedded, create_vectorstore
+from app.llm.client import get_llm_client
+from app.llm.generation_cache import generation_cache, generation_key
+from app.metrics import EMBEDDING_TOKENS, RERANK_TRUNCATED, observe_ingest_stage, observe_query_stage, record_llm_usage
+
 load_dotenv()
 
+# Max (question, pipeline) queries in flight during a comparison
+MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "8"))
+
+GENERATION_MODEL = "llama-3.1-8b-instant"
+GENERATION_TEMPERATURE = 0
+GENERATION_MAX_TOKENS = 500
+SYSTEM_PROMPT = "You are a helpful assistant that answers questions based on the provided context."
+
+# USD per million tokens for GENERATION_MODEL (Groq list price; set both to
+# 0 to compare on the free tier)
+GENERATION_PRICE_INPUT = float(os.getenv("GENERATION_PRICE_INPUT_PER_MTOK", "0.05"))
+GENERATION_PRICE_OUTPUT = float(os.getenv("GENERATION_PRICE_OUTPUT_PER_MTOK", "0.08"))
+
+# Chunks retrieved per question (unless a config sets k)
+RETRIEVAL_K = 4
+
+# Chunks embedded and inserted per vector store call
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "256"))
+
+# Approximate bytes a chunk Document costs beyond its text
+CHUNK_OVERHEAD_BYTES = 1024
+
+# Every pipeline alive in this process, so a rebuild never deletes a build
+# another comparator is still serving
+_live_pipelines: "weakref.WeakSet" = weakref.WeakSet()
+
 class RAGPipeline:
-    """Single RAG pipeline with specific configuration"""
+    """Single RAG pipeline with specific configuration
+    
+    With ``index``, the pipeline builds nothing itself: it searches the
+    index of another pipeline whose config only differs at query time
+    (k, reranker), as arranged by the ExecutionPlan.
+    """
     
-    def __init__(self, config: Dict):
+    def __init__(self, config: Dict, index: Optional["RAGPipeline"] = None):
         self.config = config
         self.name = config['name']
         self.chunk_size = config['chunk_size']
         self.overlap = config['overlap']
         self.embedder_name = config['embedder']
         self.reranker = config.get('reranker')
+        self.k = int(config.get('k') or RETRIEVAL_K)
+        # A reranker picks the k best of a larger candidate set
+        self.fetch_k = max(self.k, int(config.get('rerank_candidates') or RERANK_CANDIDATES)) if self.reranker else self.k
+        self.reranker_model = reranker_registry.get(self.reranker) if self.reranker else None
+        # Most tokens of retrieved context sent to the LLM
+        self.context_tokens = int(config.get('context_tokens') or CONTEXT_TOKEN_BUDGET)
+        self.index = index
+        self.vector_store_backend = config.get('vector_store', 'chroma')
+        self.vector_store_options = {
+            key: config[key] for key in ('quantization', 'rescore', 'ann') if config.get(key) is not None
+        }
+        self.embedding_model_name = resolve_model_name(self.embedder_name)
         
-        # Initialize FREE embeddings
+        # Shared FREE embeddings (loaded once per process, cached on disk)
         self.embeddings = self._get_embeddings()
         self.vectorstore = None
         
-        # Initialize Groq client
-        self.groq_client = Groq(
-    api_key=os.getenv("GROQ_API_KEY"),
-    http_client=httpx.Client()
-)
+        # Each build gets its own directory under persist_root; the
+        # manifest there names the current one
+        self.persist_root = os.path.join(VECTORDB_DIR, self.name)
+        self.build_id: Optional[str] = None
+        self._open_lock = threading.Lock()
+        
+        # doc_id -> IDs of its chunks in the vector store
+        self.document_chunks: Dict[str, List[str]] = {}
+        # doc_id -> source path and content hash of its file
+        self.document_files: Dict[str, Dict] = {}
+        
+        # Shared pooled Groq client (rate-limited, retried)
+        self.llm_client = get_llm_client()
         
-        # Cost tracking
+        # Cost tracking (embedding tokens from the embedder's tokenizer,
+        # generation tokens as reported by the API)
         self.embedding_tokens = 0
+        self.prompt_tokens = 0
         self.generation_tokens = 0
+        self._tokens_lock = threading.Lock()
+        
+        _live_pipelines.add(self)
+    
+    @property
+    def owner(self) -> "RAGPipeline":
+        """The pipeline whose store this one searches"""
+        return self.index or self
     
     def _get_embeddings(self):
-        """Get FREE embedding model using sentence-transformers"""
-        if self.embedder_name == "text-embedding-3-large":
-            model_name = "sentence-transformers/all-mpnet-base-v2"
-        elif self.embedder_name == "text-embedding-3-small":
-            model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        else:
-            model_name = "sentence-transformers/all-MiniLM-L6-v2"
-        
-        return HuggingFaceEmbeddings(
-            model_name=model_name,
-            model_kwargs={'device': 'cpu'},
-            encode_kwargs={'normalize_embeddings': True}
-        )
+        """Get the shared FREE sentence-transformers model for this embedder"""
+        return get_cached_embeddings(self.embedder_name)
     
     def load_documents(self, file_paths: List[str]) -> List[Document]:
         """Load documents from various file types"""
-        documents = []
+        return load_documents(file_paths)
+    
+    def fingerprint(self) -> Dict:
+        return pipeline_fingerprint(self.config, self.embedding_model_name)
+    
+    def build_vectorstore(self, chunks: List[Document], progress: Optional[IngestProgress] = None):
+        """Create vector database from chunks
         
-        for file_path in file_paths:
-            try:
-                if file_path.endswith('.pdf'):
-                    loader = PyPDFLoader(file_path)
-                elif file_path.endswith('.docx'):
-                    loader = Docx2txtLoader(file_path)
-                elif file_path.endswith('.txt'):
-                    loader = TextLoader(file_path, encoding='utf-8')
-                else:
-                    print(f"Unsupported file type: {file_path}")
-                    continue
-                
-                docs = loader.load()
-                documents.extend(docs)
-                print(f"✓ Loaded {len(docs)} pages from {os.path.basename(file_path)}")
-            except Exception as e:
-                print(f"✗ Error loading {file_path}: {str(e)}")
-        
-        return documents
-    
-    def chunk_documents(self, documents: List[Document]) -> List[Document]:
-        """Split documents into chunks"""
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=self.chunk_size,
-            chunk_overlap=self.overlap,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
+        Builds into a fresh directory so a store another comparator is still
+        serving is never appended to; builds that neither the manifest nor
+        a live pipeline refer to are removed first.
+        """
+        self.start_build()
+        self._insert_chunks(chunks, progress)
+        self._persist_vectorstore()
         
-        chunks = text_splitter.split_documents(documents)
-        print(f"✓ Created {len(chunks)} chunks (size={self.chunk_size}, overlap={self.overlap})")
+        print(f"✓ Built vector database for {self.name}")
+    
+    def start_build(self):
+        """Open a new, empty build to stream chunks into with _insert_chunks"""
+        current = read_manifest(self.persist_root)
+        keep = {p.build_id for p in list(_live_pipelines) if p is not self and p.persist_root == self.persist_root}
+        if current:
+            keep.add(current["build"])
+        prune_builds(self.persist_root, keep=tuple(b for b in keep if b))
         
-        self.embedding_tokens = sum(len(chunk.page_content.split()) for chunk in chunks)
+        self.build_id = uuid.uuid4().hex[:12]
+        self.document_chunks = {}
+        self.document_files = {}
+        self.embedding_tokens = 0
+        self.vectorstore = create_vectorstore(
+            self.vector_store_backend, self.embeddings, self._build_directory(), **self.vector_store_options
+        )
+    
+    def attach(self, manifest: Dict):
+        """Reuse the persisted build a manifest describes
         
-        return chunks
+        Only bookkeeping happens here; the store itself is opened on first use.
+        """
+        self.build_id = manifest["build"]
+        self.vectorstore = None
+        self.document_chunks = {
+            doc_id: [f"{doc_id}:{n}" for n in range(info["chunks"])]
+            for doc_id, info in manifest["documents"].items()
+        }
+        self.document_files = {
+            doc_id: {"source": info["source"], "file_hash": info["file_hash"]}
+            for doc_id, info in manifest["documents"].items()
+        }
+        self.embedding_tokens = manifest.get("embedding_tokens", 0)
+    
+    def clear_store(self):
+        """Forget the documents and delete this pipeline's persisted builds"""
+        self.vectorstore = None
+        self.build_id = None
+        self.document_chunks = {}
+        self.document_files = {}
+        keep = {p.build_id for p in list(_live_pipelines) if p is not self and p.persist_root == self.persist_root}
+        prune_builds(self.persist_root, keep=tuple(b for b in keep if b))
+        manifest_path = os.path.join(self.persist_root, MANIFEST_FILE)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        print(f"✓ Cleared vector database for {self.name}")
+    
+    def _build_directory(self) -> str:
+        return os.path.join(self.persist_root, self.build_id)
     
-    def build_vectorstore(self, chunks: List[Document]):
-        """Create vector database from chunks"""
-        persist_directory = f"./data/vectordb/{self.name}"
+    def _open_vectorstore(self):
+        """The vector store, opening an attached build on first use"""
+        if self.index is not None:
+            return self.index._open_vectorstore()
+        if self.vectorstore is None and self.build_id:
+            with self._open_lock:
+                if self.vectorstore is None:
+                    self.vectorstore = create_vectorstore(
+                        self.vector_store_backend, self.embeddings, self._build_directory(), **self.vector_store_options
+                    )
+                    print(f"✓ Reattached vector database for {self.name}")
+        return self.vectorstore
+    
+    def _insert_chunks(self, chunks: List[Document], progress: Optional[IngestProgress] = None, vectors: Optional[List] = None):
+        """Embed and insert chunks in fixed-size batches, reporting progress
         
-        self.vectorstore = Chroma.from_documents(
-            documents=chunks,
-            embedding=self.embeddings,
-            persist_directory=persist_directory
-        )
+        ``vectors`` are the chunks' embeddings when they were already
+        computed (for another index built from the same embedding set).
+        """
+        ids = self._assign_chunk_ids(chunks)
         
-        print(f"✓ Built vector database for {self.name}")
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            if progress:
+                progress.check_cancelled()
+            
+            end = start + EMBED_BATCH_SIZE
+            if vectors is None:
+                self.vectorstore.add_documents(chunks[start:end], ids=ids[start:end])
+            else:
+                add_embedded(
+                    self.vectorstore, vectors[start:end],
+                    [chunk.page_content for chunk in chunks[start:end]],
+                    [chunk.metadata for chunk in chunks[start:end]],
+                    ids[start:end],
+                )
+            
+            if progress:
+                progress.chunks_embedded(self.name, len(chunks[start:end]))
+    
+    def delete_document(self, doc_id: str) -> int:
+        """Remove every chunk of a document from the vector database and persist it"""
+        return self.delete_documents([doc_id], persist=True)[doc_id]
+    
+    def delete_documents(self, doc_ids: List[str], persist: bool = False) -> Dict[str, int]:
+        """Remove the chunks of several documents in one store delete
+        
+        Returns doc_id -> deleted chunk count. Rollbacks leave persisting
+        to the caller, which writes the store once afterwards anyway.
+        """
+        deleted, ids = {}, []
+        for doc_id in doc_ids:
+            chunk_ids = self.document_chunks.pop(doc_id, [])
+            self.document_files.pop(doc_id, None)
+            deleted[doc_id] = len(chunk_ids)
+            ids.extend(chunk_ids)
+        if ids and self._open_vectorstore() is not None:
+            self.vectorstore.delete(ids=ids)
+            if persist:
+                self._persist_vectorstore()
+            print(f"✓ Deleted {len(ids)} chunks from {self.name}")
+        return deleted
+    
+    def _persist_vectorstore(self):
+        # Chroma persists on its own; the NumPy store writes .npy files
+        if isinstance(self.vectorstore, NumpyVectorStore):
+            self.vectorstore.persist()
+        self._write_manifest()
+    
+    def _write_manifest(self):
+        """Record what the current build holds so a restart can reuse it"""
+        write_manifest(self.persist_root, {
+            "pipeline": self.name,
+            "fingerprint": self.fingerprint(),
+            "build": self.build_id,
+            "chunk_count": sum(len(ids) for ids in self.document_chunks.values()),
+            "embedding_tokens": self.embedding_tokens,
+            "documents": {
+                doc_id: {**self.document_files.get(doc_id, {"source": None, "file_hash": None}), "chunks": len(ids)}
+                for doc_id, ids in self.document_chunks.items()
+            },
+        })
     
-    def query(self, question: str) -> Dict:
-        """Query the RAG pipeline using Groq directly"""
-        if not self.vectorstore:
+    def _assign_chunk_ids(self, chunks: List[Document]) -> List[str]:
+        """Give each chunk an ID of the form <doc_id>:<n> and remember it"""
+        ids = []
+        for chunk in chunks:
+            doc_id = chunk.metadata.get('doc_id', 'unknown')
+            self.document_files.setdefault(doc_id, {
+                "source": chunk.metadata.get('source'),
+                "file_hash": chunk.metadata.get('file_hash'),
+            })
+            chunk_ids = self.document_chunks.setdefault(doc_id, [])
+            chunk_id = f"{doc_id}:{len(chunk_ids)}"
+            chunk_ids.append(chunk_id)
+            ids.append(chunk_id)
+        return ids
+    
+    def retrieve_by_vectors(self, vectors: np.ndarray, k: Optional[int] = None) -> List[List[Document]]:
+        """Top ``k`` (default: this pipeline's fetch_k) chunks for already-embedded questions, one list per vector"""
+        store = self._open_vectorstore()
+        if store is None:
             raise ValueError("Vector store not initialized. Call build_vectorstore first.")
         
-        start_time = time.time()
+        k = k or self.fetch_k
+        if isinstance(store, NumpyVectorStore):
+            # One matrix product for the whole batch
+            return store.similarity_search_by_vectors(vectors, k=k)
+        return [store.similarity_search_by_vector(vector.tolist(), k=k) for vector in vectors]
+    
+    def query(self, question: str, retrieved: Optional[Dict] = None) -> Dict:
+        """Query the RAG pipeline using Groq directly
+        
+        ``retrieved`` ({"docs", "timings"}) comes from a batched retrieval
+        (see RAGComparator.retrieve_all); without it the question is
+        embedded and searched here. With a reranker, the fetch_k candidates
+        are cut down to the k best. The result carries per-stage
+        ``timings`` (embed, retrieve, rerank, pack, generate) and the API's
+        token usage; its ``context`` is the packed passages the LLM saw.
+        """
+        if self._open_vectorstore() is None:
+            raise ValueError("Vector store not initialized. Call build_vectorstore first.")
         
         # Retrieve relevant documents
-        retriever = self.vectorstore.as_retriever(search_kwargs={"k": 4})
-        retrieved_docs = retriever.get_relevant_documents(question)
+        if retrieved is not None:
+            retrieved_docs = retrieved["docs"]
+            timings = dict(retrieved["timings"])
+        else:
+            start = time.time()
+            vector = np.asarray([self.embeddings.embed_query(question)], dtype=np.float32)
+            timings = {"embed": time.time() - start}
+            
+            start = time.time()
+            retrieved_docs = self.retrieve_by_vectors(vector)[0]
+            timings["retrieve"] = time.time() - start
         
-        # Format context from retrieved documents
-        context_text = "\n\n".join([doc.page_content for doc in retrieved_docs])
+        if self.reranker_model is not None:
+            start = time.time()
+            retrieved_docs, rerank_info = self.reranker_model.rerank(question, retrieved_docs, self.k)
+            timings["rerank"] = time.time() - start
+            if rerank_info["truncated"]:
+                RERANK_TRUNCATED.inc(pipeline=self.name)
+        
+        # Overlapping chunks are merged so no text is sent twice, then
+        # packed best-first into the context token budget
+        start = time.time()
+        context = pack_context(retrieved_docs, self._count_context_tokens, self.context_tokens)
+        timings["pack"] = time.time() - start
+        context_text = "\n\n".join(context)
         
         # Create prompt for Groq
         prompt = f"""Based on the following context, answer the question.
@@ -128,118 +343,554 @@ Question: {question}
 
 Answer:"""
         
-        # Generate answer using Groq API directly
-        try:
-            chat_completion = self.groq_client.chat.completions.create(
+        # Generate answer using Groq API directly. Identical prompts (same
+        # retrieved context in another pipeline, or a repeated run) share
+        # one completion via the generation cache.
+        key = generation_key(GENERATION_MODEL, SYSTEM_PROMPT, prompt, GENERATION_TEMPERATURE, GENERATION_MAX_TOKENS)
+        
+        def generate() -> Dict:
+            chat_completion = self.llm_client.complete(
                 messages=[
-                    {"role": "system", "content": "You are a helpful assistant that answers questions based on the provided context."},
+                    {"role": "system", "content": SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
-                model="llama-3.1-8b-instant",
-                temperature=0,
-                max_tokens=500
+                model=GENERATION_MODEL,
+                temperature=GENERATION_TEMPERATURE,
+                max_tokens=GENERATION_MAX_TOKENS
             )
-            
-            answer = chat_completion.choices[0].message.content
+            # Only real API calls are counted in /metrics
+            tokens = record_llm_usage("generate", chat_completion.usage)
+            return {"answer": chat_completion.choices[0].message.content, "tokens": tokens}
+        
+        start = time.time()
+        try:
+            # A cached answer still reports the usage of the call that made
+            # it, so every pipeline is costed as if it ran on its own
+            generation = generation_cache.get_or_create(key, generate)
+            answer, tokens = generation["answer"], generation["tokens"]
             
         except Exception as e:
             print(f"Error calling Groq API: {e}")
             answer = "Error generating answer"
+            tokens = {"prompt": 0, "completion": 0}
+        timings["generate"] = time.time() - start
         
-        processing_time = time.time() - start_time
-        
-        # Extract context
-        context = [doc.page_content for doc in retrieved_docs]
+        for stage, seconds in timings.items():
+            observe_query_stage(stage, seconds, self.name)
         
-        # Estimate generation tokens
-        self.generation_tokens += len(answer.split())
+        with self._tokens_lock:
+            self.prompt_tokens += tokens["prompt"]
+            self.generation_tokens += tokens["completion"]
         
         return {
             'answer': answer,
             'context': context,
-            'processing_time': processing_time
+            'processing_time': sum(timings.values()),
+            'timings': timings,
+            'tokens': tokens
         }
     
-    def calculate_cost(self) -> float:
-        """Calculate cost - all FREE now!"""
-        return 0.0
+    def _count_context_tokens(self, text: str) -> int:
+        count = context_token_counter()
+        if count is not None:
+            return count(text)
+        return self.embeddings.count_tokens([text])
+    
+    def calculate_cost(self, tokens: Optional[Dict[str, int]] = None) -> float:
+        """USD cost of one answer's generation call (embeddings run locally)"""
+        if not tokens:
+            return 0.0
+        return (tokens["prompt"] * GENERATION_PRICE_INPUT + tokens["completion"] * GENERATION_PRICE_OUTPUT) / 1_000_000
+
+
+# The 4 configurations a comparator starts with unless given others
+DEFAULT_PIPELINE_CONFIGS = {
+    "pipeline_a": {
+        "name": "pipeline_a",
+        "chunk_size": 512,
+        "overlap": 50,
+        "embedder": "text-embedding-3-small",
+        "reranker": None
+    },
+    "pipeline_b": {
+        "name": "pipeline_b",
+        "chunk_size": 1024,
+        "overlap": 100,
+        "embedder": "text-embedding-3-large",
+        "reranker": None
+    },
+    "pipeline_c": {
+        "name": "pipeline_c",
+        "chunk_size": 256,
+        "overlap": 25,
+        "embedder": "text-embedding-3-small",
+        "reranker": None
+    },
+    "pipeline_d": {
+        "name": "pipeline_d",
+        "chunk_size": 800,
+        "overlap": 80,
+        "embedder": "text-embedding-3-small",
+        "reranker": None
+    }
+}
 
 
 class RAGComparator:
-    """Manages multiple RAG pipelines for comparison"""
+    """Manages multiple RAG pipelines for comparison
+    
+    ``configs`` (default: DEFAULT_PIPELINE_CONFIGS) may be a whole sweep;
+    the ExecutionPlan decides which artifacts they share, so ingestion
+    cost grows with the distinct chunk/embedding/index combinations, not
+    with the number of configs.
+    """
     
-    def __init__(self):
+    def __init__(self, configs: Optional[List[Dict]] = None):
+        self.plan = ExecutionPlan(list(configs or DEFAULT_PIPELINE_CONFIGS.values()))
         self.pipelines = self._initialize_pipelines()
+        # Pipelines that own an index; only these are built and persisted
+        self.indexes = {name: self.pipelines[name] for name in self.plan.indexes}
+        
+        # doc_id -> source file name and chunk count per pipeline
+        self.documents: Dict[str, Dict] = {}
+        
+        # Serializes ingests/removals into the same pipelines
+        self._lock = threading.RLock()
+        
+        # Set by restore(): what rebuild_stale() still has to do
+        self._restore_plan: Optional[Dict] = None
     
     def _initialize_pipelines(self) -> Dict[str, RAGPipeline]:
-        """Initialize 4 different RAG configurations"""
-        configs = {
-            "pipeline_a": {
-                "name": "pipeline_a",
-                "chunk_size": 512,
-                "overlap": 50,
-                "embedder": "text-embedding-3-small",
-                "reranker": None
-            },
-            "pipeline_b": {
-                "name": "pipeline_b",
-                "chunk_size": 1024,
-                "overlap": 100,
-                "embedder": "text-embedding-3-large",
-                "reranker": None
-            },
-            "pipeline_c": {
-                "name": "pipeline_c",
-                "chunk_size": 256,
-                "overlap": 25,
-                "embedder": "text-embedding-3-small",
-                "reranker": None
-            },
-            "pipeline_d": {
-                "name": "pipeline_d",
-                "chunk_size": 800,
-                "overlap": 80,
-                "embedder": "text-embedding-3-small",
-                "reranker": None
-            }
+        """Initialize every configured pipeline, index owners first"""
+        owners = {name: RAGPipeline(self.plan.configs[name]) for name in self.plan.indexes}
+        return {
+            name: owners.get(name) or RAGPipeline(config, index=owners[self.plan.index_of[name]])
+            for name, config in self.plan.configs.items()
         }
-        
-        return {name: RAGPipeline(config) for name, config in configs.items()}
     
-    def ingest_documents(self, file_paths: List[str]):
+    def ingest_documents(self, file_paths: List[str], progress: Optional[IngestProgress] = None) -> Dict:
         """Ingest documents into all pipelines"""
         print("\n📚 INGESTING DOCUMENTS INTO ALL PIPELINES...")
         print("=" * 60)
         
-        for name, pipeline in self.pipelines.items():
-            print(f"\n🔧 Building {name}...")
+        with self._lock:
+            before = self._embedding_cache_stats()
+            
+            for pipeline in self.indexes.values():
+                pipeline.start_build()
+            
+            # Parse every file once, streaming its pages through all pipelines
+            failed = []
+            timings = {}
+            sources = self._stream_pages(iter_documents(file_paths, progress, failed=failed), progress, timings=timings)
             
-            # Load documents
-            documents = pipeline.load_documents(file_paths)
+            for name, pipeline in self.indexes.items():
+                pipeline.delete_documents(failed)
+                pipeline._persist_vectorstore()
+                print(f"✓ Built vector database for {name} ({pipeline.embedding_tokens} tokens)")
+                if progress:
+                    progress.pipeline_done(name)
             
-            # Chunk documents
-            chunks = pipeline.chunk_documents(documents)
+            self.documents = {}
+            self._record_documents({doc_id: source for doc_id, source in sources.items() if doc_id not in failed})
             
-            # Build vector store
-            pipeline.build_vectorstore(chunks)
+            print("\n✅ All pipelines ready!")
+            return {"embedding_cache": self._embedding_cache_delta(before), "timings": self._round_timings(timings)}
+    
+    def add_documents(self, file_paths: List[str], progress: Optional[IngestProgress] = None) -> Dict:
+        """Add documents to every pipeline without rebuilding the others"""
+        print(f"\n📚 ADDING {len(file_paths)} DOCUMENTS TO ALL PIPELINES...")
         
-        print("\n✅ All pipelines ready!")
+        with self._lock:
+            before = self._embedding_cache_stats()
+            
+            for pipeline in self.indexes.values():
+                if pipeline._open_vectorstore() is None:
+                    pipeline.start_build()
+            
+            # Identical content is already indexed under the same doc_id,
+            # so those files are not even parsed
+            skipped, failed = [], []
+            sources = {}
+            timings = {}
+            pages = iter_documents(file_paths, progress, skip_ids=set(self.documents), skipped=skipped, failed=failed)
+            
+            try:
+                self._stream_pages(pages, progress, sources, timings=timings)
+            except IngestCancelled:
+                # Don't leave the new documents in only some pipelines
+                failed = list(sources)
+                raise
+            finally:
+                for name, pipeline in self.indexes.items():
+                    pipeline.delete_documents(failed)
+                    # Nothing to write when every file was already indexed
+                    if sources:
+                        pipeline._persist_vectorstore()
+                    if progress and not progress.cancelled:
+                        progress.pipeline_done(name)
+            
+            added = self._record_documents({doc_id: source for doc_id, source in sources.items() if doc_id not in failed})
+            
+            return {
+                "added": added,
+                "skipped": sorted(skipped),
+                "embedding_cache": self._embedding_cache_delta(before),
+                "timings": self._round_timings(timings),
+            }
     
-    def compare_pipelines(self, questions: List[str]) -> Dict:
-        """Run all questions through all pipelines"""
-        results = {}
+    def _stream_pages(
+        self,
+        pages,
+        progress: Optional[IngestProgress] = None,
+        sources: Optional[Dict] = None,
+        pipelines: Optional[Dict[str, RAGPipeline]] = None,
+        timings: Optional[Dict] = None,
+    ) -> Dict[str, str]:
+        """Chunk pages as they arrive and insert them in fixed-size batches
+        
+        ``pipelines`` are index owners (default: all of them). Every chunk
+        set comes from one MultiConfigChunker pass per page and is buffered
+        as spans over the page text; they only become Documents when their
+        batch is flushed. A batch is embedded once per embedding set
+        (chunk_size, overlap, embedding model) and inserted into every
+        index built from it. Each embedding set buffers at most
+        EMBED_BATCH_SIZE chunks, and all buffers are flushed early once they
+        hold half of INGEST_MEMORY_LIMIT_MB, so memory does not grow with
+        the upload size. Returns doc_id -> source of every page seen.
+        
+        Stage times are added to ``timings``: ``load`` is the time spent
+        waiting for parsed pages (parsing overlaps with the rest when it
+        runs in the process pool), ``chunk`` the chunker passes, ``embed``
+        per embedding set the embedding of its batches and ``index`` per
+        index their insertion.
+        """
+        sources = {} if sources is None else sources
+        pipelines = self.indexes if pipelines is None else pipelines
+        timings = {} if timings is None else timings
+        timings.setdefault("load", 0.0)
+        timings.setdefault("chunk", 0.0)
+        embed_times = timings.setdefault("embed", {})
+        index_times = timings.setdefault("index", {})
+        
+        # embedding set -> indexes built from it
+        groups: Dict[tuple, List[RAGPipeline]] = {}
+        for pipeline in pipelines.values():
+            groups.setdefault(embedding_key(pipeline.config), []).append(pipeline)
+        chunk_sets = list(dict.fromkeys(key[:2] for key in groups))
+        
+        buffers: Dict[tuple, List[ChunkSpan]] = {key: [] for key in groups}
+        buffered_bytes = 0
+        chunker = MultiConfigChunker(chunk_sets)
+        
+        def size(spans: List[ChunkSpan]) -> int:
+            # What the spans cost once materialized
+            return sum(span.end - span.start + CHUNK_OVERHEAD_BYTES for span in spans)
+        
+        def flush(key: tuple):
+            nonlocal buffered_bytes
+            spans = buffers[key]
+            if spans:
+                indexes = groups[key]
+                chunks = [span.materialize() for span in spans]
+                texts = [chunk.page_content for chunk in chunks]
+                
+                # The embedding model is part of the key, so every index in
+                # the group shares these vectors and this token count
+                start = time.time()
+                vectors, tokens = indexes[0].embeddings.embed_and_count(texts)
+                set_name = embedding_set_name(key)
+                embed_times[set_name] = embed_times.get(set_name, 0.0) + time.time() - start
+                
+                for pipeline in indexes:
+                    pipeline.embedding_tokens += tokens
+                    EMBEDDING_TOKENS.inc(tokens, pipeline=pipeline.name)
+                    
+                    start = time.time()
+                    pipeline._insert_chunks(chunks, progress, vectors)
+                    index_times[pipeline.name] = index_times.get(pipeline.name, 0.0) + time.time() - start
+                
+                buffered_bytes -= size(spans)
+                buffers[key] = []
         
-        for question in questions:
-            print(f"\n❓ Question: {question}")
-            question_results = {}
+        pages = iter(pages)
+        while True:
+            start = time.time()
+            page = next(pages, None)
+            timings["load"] += time.time() - start
+            if page is None:
+                break
+            
+            sources.setdefault(page.metadata['doc_id'], page.metadata.get('source', ''))
+            
+            start = time.time()
+            page_chunks = dict(zip(chunk_sets, chunker.chunk(page)))
+            timings["chunk"] += time.time() - start
             
-            for name, pipeline in self.pipelines.items():
-                result = pipeline.query(question)
-                result['cost'] = pipeline.calculate_cost()
-                question_results[name] = result
+            for key, indexes in groups.items():
+                chunks = page_chunks[key[:2]]
+                if progress:
+                    for pipeline in indexes:
+                        progress.chunks_created(pipeline.name, len(chunks))
+                buffers[key].extend(chunks)
+                buffered_bytes += size(chunks)
                 
-                print(f"  ✓ {name}: {result['processing_time']:.2f}s (FREE!)")
+                if len(buffers[key]) >= EMBED_BATCH_SIZE:
+                    flush(key)
+                if buffered_bytes > INGEST_MEMORY_LIMIT_BYTES // 2:
+                    for buffered in buffers:
+                        flush(buffered)
+        
+        for key in buffers:
+            flush(key)
+        
+        observe_ingest_stage("load", timings["load"])
+        observe_ingest_stage("chunk", timings["chunk"])
+        for set_name, seconds in embed_times.items():
+            observe_ingest_stage("embed", seconds, set_name)
+        for name, seconds in index_times.items():
+            observe_ingest_stage("index", seconds, name)
+        return sources
+    
+    def remove_document(self, doc_id: str) -> Dict:
+        """Delete one document's chunks from every pipeline"""
+        with self._lock:
+            if doc_id not in self.documents:
+                raise KeyError(doc_id)
+            
+            deleted = {name: pipeline.delete_document(doc_id) for name, pipeline in self.indexes.items()}
+            document = self.documents.pop(doc_id)
+        
+        # Pipelines sharing an index report its count
+        deleted = {name: deleted[self.plan.index_of[name]] for name in self.pipelines}
+        
+        return {"doc_id": doc_id, "source": document["source"], "deleted_chunks": deleted}
+    
+    def restore(self) -> Dict:
+        """Reattach every index whose persisted store is still valid
+        
+        A store is reused when its manifest matches the pipeline's current
+        config and holds the same documents as the others; it is opened
+        lazily on first query. The others are stale and are rebuilt by
+        ``rebuild_stale`` from the recorded source files. Documents whose
+        file is gone or changed are dropped everywhere so all pipelines
+        keep answering over the same corpus.
+        """
+        with self._lock:
+            manifests = {name: read_manifest(p.persist_root) for name, p in self.indexes.items()}
+            corpus: Dict[str, Dict] = {}
+            for manifest in manifests.values():
+                for doc_id, info in (manifest or {}).get("documents", {}).items():
+                    corpus.setdefault(doc_id, info)
+            
+            reattached, stale = [], []
+            for name, pipeline in self.indexes.items():
+                manifest = manifests[name]
+                if manifest and manifest["fingerprint"] == pipeline.fingerprint() \
+                        and os.path.isdir(os.path.join(pipeline.persist_root, manifest["build"])) \
+                        and set(manifest["documents"]) == set(corpus):
+                    pipeline.attach(manifest)
+                    reattached.append(name)
+                elif manifest or corpus:
+                    stale.append(name)
+            
+            dropped = []
+            if stale:
+                dropped = sorted(doc_id for doc_id, info in corpus.items() if not self._source_intact(info))
+            kept = {doc_id: info for doc_id, info in corpus.items() if doc_id not in dropped}
+            
+            if not kept:
+                # Nothing left that every pipeline could serve
+                for pipeline in self.indexes.values():
+                    if manifests[pipeline.name]:
+                        pipeline.clear_store()
+                self._restore_plan = None
+                reattached, stale = [], []
+            else:
+                self._restore_plan = {"stale": stale, "dropped": dropped, "documents": kept}
+                if not stale:
+                    self._record_restored(kept)
+            
+            report = {
+                "reattached": reattached,
+                "stale": stale,
+                "documents": len(kept),
+                "dropped_documents": dropped,
+            }
+            print(f"♻️  Restore: {len(reattached)} pipelines reattached, {len(stale)} stale, {len(kept)} documents")
+            return report
+    
+    def restore_files(self) -> List[str]:
+        """Source files rebuild_stale() will parse"""
+        if not self._restore_plan:
+            return []
+        return sorted({info["source"] for info in self._restore_plan["documents"].values()})
+    
+    def rebuild_stale(self, progress: Optional[IngestProgress] = None) -> Dict:
+        """Finish a restore: rebuild stale pipelines and drop lost documents"""
+        with self._lock:
+            plan = self._restore_plan
+            if not plan:
+                return {"rebuilt": [], "dropped_documents": []}
             
-            results[question] = question_results
+            before = self._embedding_cache_stats()
+            stale = {name: self.indexes[name] for name in plan["stale"]}
+            for name, pipeline in stale.items():
+                print(f"🔧 Rebuilding stale {name}...")
+                pipeline.start_build()
+            
+            pages = iter_documents(self.restore_files(), progress)
+            timings = {}
+            self._stream_pages(
+                (page for page in pages if page.metadata['doc_id'] in plan["documents"]),
+                progress, pipelines=stale, timings=timings
+            )
+            
+            for name, pipeline in self.indexes.items():
+                if name in stale:
+                    pipeline._persist_vectorstore()
+                elif plan["dropped"]:
+                    pipeline.delete_documents(plan["dropped"])
+                    pipeline._persist_vectorstore()
+                if progress:
+                    progress.pipeline_done(name)
+            
+            self._record_restored(plan["documents"])
+            self._restore_plan = None
+            return {
+                "rebuilt": plan["stale"],
+                "dropped_documents": plan["dropped"],
+                "embedding_cache": self._embedding_cache_delta(before),
+                "timings": self._round_timings(timings),
+            }
+    
+    @staticmethod
+    def _round_timings(timings: Dict) -> Dict:
+        """Ingest stage seconds as reported to clients"""
+        return {
+            stage: {name: round(t, 3) for name, t in value.items()} if isinstance(value, dict) else round(value, 3)
+            for stage, value in timings.items()
+        }
+    
+    @staticmethod
+    def _source_intact(info: Dict) -> bool:
+        source = info.get("source")
+        return bool(source) and os.path.exists(source) and file_hash(source) == info.get("file_hash")
+    
+    def _record_restored(self, corpus: Dict[str, Dict]):
+        self.documents = {
+            doc_id: {
+                "source": os.path.basename(info.get("source") or ''),
+                "chunks": {name: len(p.owner.document_chunks.get(doc_id, [])) for name, p in self.pipelines.items()},
+            }
+            for doc_id, info in corpus.items()
+        }
+    
+    def _record_documents(self, sources: Dict[str, str]) -> List[str]:
+        """Remember which documents are indexed (doc_id -> source path)"""
+        added = []
+        for doc_id, source in sources.items():
+            if doc_id not in self.documents:
+                self.documents[doc_id] = {
+                    "source": os.path.basename(source or ''),
+                    "chunks": {name: len(p.owner.document_chunks.get(doc_id, [])) for name, p in self.pipelines.items()},
+                }
+                added.append(doc_id)
+        return added
+    
+    def _embedding_caches(self, names: Optional[List[str]] = None) -> Dict:
+        # Pipelines with the same embedder share one cache
+        return {p.embedding_model_name: p.embeddings for name, p in self.pipelines.items() if names is None or name in names}
+    
+    def _embedding_cache_stats(self) -> Dict:
+        return {model: cache.stats() for model, cache in self._embedding_caches().items()}
+    
+    def _embedding_cache_delta(self, before: Dict) -> Dict:
+        """Cache hits/misses since the ``before`` snapshot"""
+        cache_stats = {}
+        for model, after in self._embedding_cache_stats().items():
+            cache_stats[model] = {
+                "hits": after["hits"] - before[model]["hits"],
+                "misses": after["misses"] - before[model]["misses"],
+            }
+            print(f"✓ Embedding cache {model}: {cache_stats[model]['hits']} hits, {cache_stats[model]['misses']} misses")
+        return cache_stats
+    
+    def retrieve_all(self, questions: List[str], names: Optional[List[str]] = None) -> Dict[str, Dict[str, Dict]]:
+        """Retrieve context for every (question, pipeline) pair up front
+        
+        Pipelines sharing an embedder share its query vectors, so query-side
+        embedding cost no longer grows with the pipeline count, and
+        pipelines sharing an index share one search for the largest fetch_k
+        among them. Each pair's ``timings`` (embed, retrieve) are its share of the
+        batches. ``names`` limits it to some pipelines (default: all).
+        """
+        questions = list(dict.fromkeys(questions))
+        retrieved = {question: {} for question in questions}
+        if not questions:
+            return retrieved
+        
+        embed_times = {}
+        vectors = {}
+        for model, embeddings in self._embedding_caches(names).items():
+            start = time.time()
+            vectors[model] = np.asarray(embeddings.embed_queries(questions), dtype=np.float32)
+            embed_times[model] = time.time() - start
+        
+        searches = 0
+        for owner, served in self.plan.indexes.items():
+            served = [name for name in served if names is None or name in names]
+            if not served:
+                continue
+            index = self.indexes[owner]
+            start = time.time()
+            docs = index.retrieve_by_vectors(
+                vectors[index.embedding_model_name], k=max(self.pipelines[name].fetch_k for name in served)
+            )
+            searches += 1
+            timings = {
+                "embed": embed_times[index.embedding_model_name] / len(questions),
+                "retrieve": (time.time() - start) / len(questions),
+            }
+            for name in served:
+                k = self.pipelines[name].fetch_k
+                for question, question_docs in zip(questions, docs):
+                    retrieved[question][name] = {"docs": question_docs[:k], "timings": timings}
+        
+        print(f"✓ Retrieved {len(questions)} questions with {len(vectors)} embedding batches and {searches} searches")
+        return retrieved
+    
+    def query_pipeline(self, question: str, name: str, retrieved: Optional[Dict] = None) -> Dict:
+        """Run one question through one pipeline"""
+        pipeline = self.pipelines[name]
+        result = pipeline.query(question, retrieved)
+        result['cost'] = pipeline.calculate_cost(result['tokens'])
+        print(f"  ✓ {name}: {result['processing_time']:.2f}s ${result['cost']:.6f} ❓ {question}")
+        return result
+    
+    def compare_pipelines(self, questions: List[str], max_concurrency: Optional[int] = None, names: Optional[List[str]] = None) -> Dict:
+        """Run all questions through all pipelines (or only ``names``)
+        
+        Queries run in a bounded thread pool (``max_concurrency`` in flight,
+        default ``RAG_MAX_CONCURRENCY``); pass 1 for the old sequential order.
+        """
+        max_concurrency = max_concurrency or MAX_CONCURRENCY
+        names = list(self.pipelines) if names is None else names
+        
+        # Pre-build the result structure so ordering matches the sequential run
+        results = {question: {name: None for name in names} for question in questions}
+        
+        # Embed and search every question in batches; only generation fans out
+        retrieved = self.retrieve_all(questions, names)
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {
+                executor.submit(self.query_pipeline, question, name, retrieved[question][name]): (question, name)
+                for question in results
+                for name in names
+            }
+            for future in as_completed(futures):
+                question, name = futures[future]
+                results[question][name] = future.result()
         
-        return results
\ No newline at end of file
+        return results
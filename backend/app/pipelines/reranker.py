@@ -0,0 +1,182 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from langchain.schema import Document
+
+# Map the config's reranker names onto FREE cross-encoder models; any other
+# name is taken as a HuggingFace model ID
+RERANKER_MODELS = {
+    "ms-marco-MiniLM-L-6-v2": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+    "ms-marco-TinyBERT-L-2-v2": "cross-encoder/ms-marco-TinyBERT-L-2-v2",
+    "bge-reranker-base": "BAAI/bge-reranker-base",
+    "cross-encoder": "cross-encoder/ms-marco-MiniLM-L-6-v2",
+}
+
+# Candidates retrieved per question for a reranking pipeline to choose from
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "20"))
+# (question, chunk) pairs per forward pass
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+# Per-question time for scoring; candidates left when it runs out are not scored
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "250"))
+# Tokens per pair the cross-encoder sees (longer chunks are truncated)
+RERANK_MAX_LENGTH = int(os.getenv("RERANK_MAX_LENGTH", "512"))
+RERANK_CACHE_SIZE = int(os.getenv("RERANK_CACHE_SIZE", "20000"))
+
+
+def resolve_reranker_name(reranker_name: str) -> str:
+    """Translate a pipeline's reranker name into a HuggingFace model name"""
+    return RERANKER_MODELS.get(reranker_name, reranker_name)
+
+
+def pair_key(question: str, text: str) -> str:
+    payload = question.encode('utf-8') + b"\0" + text.encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+
+class CrossEncoderReranker:
+    """Scores (question, chunk) pairs with a cross-encoder on the CPU.
+
+    Uncached pairs are sorted by length and scored in batches of
+    RERANK_BATCH_SIZE, so each batch pads to a similar length. Scores are
+    kept in an LRU cache shared by every pipeline using the model (they
+    mostly retrieve the same chunks). Scoring stops before a batch that
+    would run past the latency budget, estimated from the time per pair so
+    far, or when the budget runs out while waiting for other pipelines'
+    batches; unscored candidates then rank after the scored ones, in
+    retrieval order. The model is loaded on first use; if it cannot be,
+    retrieval order is kept.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = RERANK_BATCH_SIZE, max_entries: int = RERANK_CACHE_SIZE):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        self._model = None
+        self._load_failed = False
+        self._scores: "OrderedDict[str, float]" = OrderedDict()
+        # Running estimate of scoring seconds per pair
+        self._seconds_per_pair: Optional[float] = None
+        self._lock = threading.Lock()
+        # One forward pass at a time; torch already uses every core
+        self._predict_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.truncated = 0
+
+    def _get_model(self):
+        if self._model is None and not self._load_failed:
+            with self._predict_lock:
+                if self._model is None and not self._load_failed:
+                    try:
+                        from sentence_transformers import CrossEncoder
+                        self._model = CrossEncoder(self.model_name, device='cpu', max_length=RERANK_MAX_LENGTH)
+                        print(f"✓ Loaded reranker model {self.model_name}")
+                    except Exception as e:
+                        print(f"⚠️  Could not load reranker {self.model_name} ({e}), keeping retrieval order")
+                        self._load_failed = True
+        return self._model
+
+    def rerank(
+        self,
+        question: str,
+        docs: List[Document],
+        top_n: int,
+        budget_ms: Optional[float] = RERANK_LATENCY_BUDGET_MS,
+    ) -> Tuple[List[Document], Dict]:
+        """The ``top_n`` best of ``docs`` for ``question``, and what it took"""
+        start = time.time()
+        texts = [doc.page_content for doc in docs]
+        keys = [pair_key(question, text) for text in texts]
+
+        scores: Dict[int, float] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    scores[i] = self._scores[key]
+            self.hits += len(scores)
+
+        # Length buckets: neighbours in this order pad to similar lengths
+        pending = sorted((i for i in range(len(docs)) if i not in scores), key=lambda i: len(texts[i]))
+        model = self._get_model() if pending else None
+        truncated = False
+
+        while pending and model is not None:
+            batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+            # Waiting for other pipelines' batches counts against the budget
+            if budget_ms is None:
+                self._predict_lock.acquire()
+            elif not self._predict_lock.acquire(timeout=max(0.0, budget_ms / 1000 - (time.time() - start))):
+                truncated = True
+                break
+            try:
+                if budget_ms is not None and self._seconds_per_pair is not None:
+                    expected = time.time() - start + self._seconds_per_pair * len(batch)
+                    if expected * 1000 > budget_ms:
+                        truncated = True
+                        break
+
+                batch_start = time.time()
+                batch_scores = model.predict(
+                    [(question, texts[i]) for i in batch],
+                    batch_size=len(batch),
+                    show_progress_bar=False,
+                )
+                per_pair = (time.time() - batch_start) / len(batch)
+            finally:
+                self._predict_lock.release()
+
+            with self._lock:
+                self._seconds_per_pair = per_pair if self._seconds_per_pair is None else 0.8 * self._seconds_per_pair + 0.2 * per_pair
+                self.misses += len(batch)
+                for i, score in zip(batch, batch_scores):
+                    scores[i] = float(score)
+                    self._scores[keys[i]] = float(score)
+                while len(self._scores) > self.max_entries:
+                    self._scores.popitem(last=False)
+
+        if truncated:
+            with self._lock:
+                self.truncated += 1
+
+        # Scored best-first, then the rest in retrieval order (stable sort)
+        order = sorted(range(len(docs)), key=lambda i: -scores[i] if i in scores else float('inf'))
+        info = {"candidates": len(docs), "scored": len(scores), "truncated": truncated}
+        return [docs[i] for i in order[:top_n]], info
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "truncated": self.truncated,
+                "entries": len(self._scores),
+                "ms_per_pair": round(self._seconds_per_pair * 1000, 3) if self._seconds_per_pair else None,
+            }
+
+
+class RerankerRegistry:
+    """Process-wide rerankers, one per model"""
+
+    def __init__(self):
+        self._rerankers: Dict[str, CrossEncoderReranker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, reranker_name: str) -> CrossEncoderReranker:
+        model_name = resolve_reranker_name(reranker_name)
+        with self._lock:
+            reranker = self._rerankers.get(model_name)
+            if reranker is None:
+                reranker = self._rerankers[model_name] = CrossEncoderReranker(model_name)
+            return reranker
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            rerankers = dict(self._rerankers)
+        return {name: reranker.stats() for name, reranker in rerankers.items()}
+
+
+reranker_registry = RerankerRegistry()
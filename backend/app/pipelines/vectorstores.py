@@ -0,0 +1,473 @@
+import os
+import json
+import uuid
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from langchain_community.vectorstores import Chroma
+from langchain.schema import Document
+from langchain.schema.embeddings import Embeddings
+from langchain.schema.vectorstore import VectorStore
+
+VECTOR_STORE_BACKENDS = ("chroma", "numpy")
+QUANTIZATION_MODES = (None, "float16", "int8")
+
+# Rows upcast to float32 at a time when scoring a quantized matrix
+SCORE_BLOCK_ROWS = 4096
+
+# IVF defaults; below MIN_POINTS_PER_LIST rows per list search stays exact
+IVF_DEFAULTS = {"type": "ivf", "nlist": 256, "nprobe": 8, "train_iterations": 10}
+MIN_POINTS_PER_LIST = 4
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact in-process search over one contiguous matrix.
+
+    Embeddings are L2-normalized, so cosine similarity is a plain dot
+    product; top-k comes from ``np.argpartition`` instead of a full sort.
+    Rows grow by doubling, deletes compact the matrix, and ``persist``
+    writes one ``.npy`` per array (reopened as read-only memmaps) plus a
+    JSON docstore.
+
+    With ``quantization="float16"`` or ``"int8"`` (one float32 scale per
+    row) the searched matrix shrinks 2x or ~4x. If ``rescore`` is on, the
+    float32 vectors are kept as well (on disk once persisted) and the top
+    ``k * rescore_factor`` approximate hits are re-ranked exactly.
+
+    ``ann={"type": "ivf", "nlist": ..., "nprobe": ...}`` switches to an
+    inverted-file index: spherical k-means centroids, and each query only
+    scores the rows in its ``nprobe`` closest lists. Centroids are trained
+    lazily on first search and retrained once the store doubles in size.
+    """
+
+    DOCSTORE_FILE = "docstore.json"
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        persist_directory: Optional[str] = None,
+        quantization: Optional[str] = None,
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        ann: Optional[Dict] = None,
+    ):
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Unknown quantization: {quantization}")
+        if ann and ann.get("type", "ivf") != "ivf":
+            raise ValueError(f"The numpy vector store only supports IVF, not {ann.get('type')}")
+
+        self.embedding_function = embedding_function
+        self.persist_directory = persist_directory
+        self.quantization = quantization
+        self.rescore = bool(quantization) and rescore
+        self.rescore_factor = rescore_factor
+        self.ann = {**IVF_DEFAULTS, **ann} if ann else None
+
+        # "codes" is what gets searched; "scales" exists for int8,
+        # "full" holds float32 rows for re-scoring a quantized index and
+        # "assign" holds each row's IVF list
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._size = 0
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[dict] = []
+        self._rows = {}
+        self._lock = threading.RLock()
+        # Changed since the last persist (or load); a new store still has to be written
+        self._dirty = True
+
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        if persist_directory and os.path.exists(os.path.join(persist_directory, self.DOCSTORE_FILE)):
+            self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding_function
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _encode(self, vectors: np.ndarray) -> Dict[str, np.ndarray]:
+        """Split float32 rows into the arrays this store keeps"""
+        encoded = {}
+        if self.ann:
+            if self._centroids is not None:
+                encoded["assign"] = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+            else:
+                encoded["assign"] = np.full(len(vectors), -1, dtype=np.int32)
+
+        if self.quantization is None:
+            encoded["codes"] = vectors
+            return encoded
+
+        if self.quantization == "float16":
+            encoded["codes"] = vectors.astype(np.float16)
+        else:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales[scales == 0] = 1.0
+            encoded["codes"] = np.round(vectors / scales[:, None]).astype(np.int8)
+            encoded["scales"] = scales.astype(np.float32)
+
+        if self.rescore:
+            encoded["full"] = vectors
+        return encoded
+
+    def _reserve(self, encoded: Dict[str, np.ndarray]):
+        """Make room for the new rows, doubling the capacity"""
+        needed = self._size + len(encoded["codes"])
+        for name, rows in encoded.items():
+            array = self._arrays.get(name)
+            if array is not None and array.shape[0] >= needed and array.flags.writeable:
+                continue
+
+            capacity = max(needed, 2 * (array.shape[0] if array is not None else 0), 64)
+            grown = np.empty((capacity,) + rows.shape[1:], dtype=rows.dtype)
+            if self._size:
+                grown[:self._size] = array[:self._size]
+            self._arrays[name] = grown
+
+    def add_vectors(self, vectors: np.ndarray, texts: List[str], metadatas: List[dict], ids: List[str]):
+        """Insert precomputed vectors (ids that already exist are replaced)"""
+        encoded = self._encode(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            replaced = [i for i in ids if i in self._rows]
+            if replaced:
+                self.delete(replaced)
+
+            self._reserve(encoded)
+            for name, rows in encoded.items():
+                self._arrays[name][self._size:self._size + len(ids)] = rows
+            for offset, (doc_id, text, metadata) in enumerate(zip(ids, texts, metadatas)):
+                self._rows[doc_id] = self._size + offset
+                self._ids.append(doc_id)
+                self._texts.append(text)
+                self._metadatas.append(metadata)
+            self._size += len(ids)
+            self._lists = None
+            self._dirty = True
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [str(uuid.uuid4()) for _ in texts]
+
+        vectors = self.embedding_function.embed_documents(texts)
+        self.add_vectors(np.asarray(vectors, dtype=np.float32), texts, metadatas, ids)
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        if not ids:
+            return False
+
+        with self._lock:
+            drop = {self._rows[i] for i in ids if i in self._rows}
+            if not drop:
+                return False
+
+            mask = np.ones(self._size, dtype=bool)
+            mask[list(drop)] = False
+            keep = np.flatnonzero(mask)
+            self._arrays = {name: np.ascontiguousarray(array[keep]) for name, array in self._arrays.items()}
+            self._ids = [self._ids[row] for row in keep]
+            self._texts = [self._texts[row] for row in keep]
+            self._metadatas = [self._metadatas[row] for row in keep]
+            self._size = len(keep)
+            self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+            self._lists = None
+            self._dirty = True
+        return True
+
+    def _top_k(self, scores: np.ndarray, k: int) -> np.ndarray:
+        """Indices of the k best scores along the last axis, best first"""
+        k = min(k, scores.shape[-1])
+        if k < scores.shape[-1]:
+            part = np.argpartition(-scores, k - 1, axis=-1)[..., :k]
+        else:
+            part = np.broadcast_to(np.arange(scores.shape[-1]), scores.shape[:-1] + (scores.shape[-1],))
+        order = np.argsort(-np.take_along_axis(scores, part, axis=-1), axis=-1)
+        return np.take_along_axis(part, order, axis=-1)
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Dot products of every query with every stored row (or just ``rows``)"""
+        codes = self._arrays["codes"]
+        if rows is not None:
+            scores = queries @ codes[rows].astype(np.float32).T
+            if "scales" in self._arrays:
+                scores *= self._arrays["scales"][rows]
+            return scores
+
+        if self.quantization is None:
+            return queries @ codes[:self._size].T
+
+        # Upcast block by block so scoring never copies the whole matrix
+        scores = np.empty((len(queries), self._size), dtype=np.float32)
+        for start in range(0, self._size, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, self._size)
+            scores[:, start:end] = queries @ codes[start:end].astype(np.float32).T
+        if "scales" in self._arrays:
+            scores *= self._arrays["scales"][:self._size]
+        return scores
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        """Best available float32 version of some rows"""
+        if "full" in self._arrays:
+            return np.asarray(self._arrays["full"][rows], dtype=np.float32)
+        vectors = self._arrays["codes"][rows].astype(np.float32)
+        if "scales" in self._arrays:
+            vectors *= self._arrays["scales"][rows][:, None]
+        return vectors
+
+    def _train(self):
+        """Spherical k-means on a sample, then assign every row to a list"""
+        rng = np.random.default_rng(0)
+        nlist = self.ann["nlist"]
+        sample = self._decode(np.sort(rng.choice(self._size, min(self._size, nlist * 32), replace=False)))
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(self.ann["train_iterations"]):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            # Per-list sums via a sort + reduceat (much faster than np.add.at)
+            order = np.argsort(assign, kind="stable")
+            counts = np.bincount(assign, minlength=nlist)
+            sums = np.zeros_like(centroids)
+            present = np.flatnonzero(counts)
+            starts = np.concatenate(([0], np.cumsum(counts[present])[:-1]))
+            sums[present] = np.add.reduceat(sample[order], starts, axis=0)
+            # Empty lists keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            centroids /= np.linalg.norm(centroids, axis=1, keepdims=True)
+        self._centroids = centroids.astype(np.float32)
+
+        assign = np.empty(self._size, dtype=np.int32)
+        for start in range(0, self._size, SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, self._size)
+            assign[start:end] = np.argmax(self._decode(np.arange(start, end)) @ self._centroids.T, axis=1)
+
+        if not self._arrays["assign"].flags.writeable:
+            self._arrays["assign"] = np.array(self._arrays["assign"])
+        self._arrays["assign"][:self._size] = assign
+        self._trained_size = self._size
+        self._lists = None
+        self._dirty = True
+
+    def _ivf_ready(self) -> bool:
+        """Train/refresh the IVF lists if needed; False means search exactly"""
+        if not self.ann or self._size < self.ann["nlist"] * MIN_POINTS_PER_LIST:
+            return False
+
+        if self._centroids is None or self._size > 2 * self._trained_size:
+            self._train()
+
+        if self._lists is None:
+            assign = self._arrays["assign"][:self._size]
+            order = np.argsort(assign, kind="stable")
+            offsets = np.searchsorted(assign[order], np.arange(self.ann["nlist"] + 1))
+            self._lists = (order, offsets)
+        return True
+
+    def _rescore(self, query: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        exact = self._arrays["full"][rows] @ query
+        top = self._top_k(exact, k)
+        return rows[top], exact[top]
+
+    def _search(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """(rows, scores) per query, best first"""
+        if not len(queries):
+            return []
+
+        rescore = self.rescore and "full" in self._arrays
+        fetch = k * self.rescore_factor if rescore else k
+
+        if self._ivf_ready():
+            order, offsets = self._lists
+            probes = self._top_k(queries @ self._centroids.T, self.ann["nprobe"])
+            candidate_lists = [
+                np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe])
+                for probe in probes
+            ]
+        else:
+            candidate_lists = [None] * len(queries)
+
+        if candidate_lists[0] is None:
+            all_scores = self._scores(queries)
+
+        results = []
+        for q, candidates in enumerate(candidate_lists):
+            if candidates is None:
+                scores = all_scores[q]
+                top = self._top_k(scores, fetch)
+                rows, row_scores = top, scores[top]
+            else:
+                scores = self._scores(queries[q:q + 1], candidates)[0]
+                top = self._top_k(scores, fetch)
+                rows, row_scores = candidates[top], scores[top]
+
+            if rescore:
+                rows, row_scores = self._rescore(queries[q], rows, k)
+            results.append((rows, row_scores))
+        return results
+
+    def _document(self, row: int) -> Document:
+        return Document(page_content=self._texts[row], metadata=dict(self._metadatas[row]))
+
+    def similarity_search_by_vectors_with_score(self, vectors: np.ndarray, k: int = 4) -> List[List[Tuple[Document, float]]]:
+        """Batched search: one result list per query vector"""
+        queries = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        with self._lock:
+            if not self._size:
+                return [[] for _ in range(len(queries))]
+            return [
+                [(self._document(row), float(score)) for row, score in zip(rows, scores)]
+                for rows, scores in self._search(queries, k)
+            ]
+
+    def similarity_search_by_vectors(self, vectors: np.ndarray, k: int = 4) -> List[List[Document]]:
+        return [[doc for doc, _ in hits] for hits in self.similarity_search_by_vectors_with_score(vectors, k)]
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vectors([embedding], k)[0]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        vector = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vectors_with_score([vector], k)[0]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        # Cosine similarity of normalized vectors, mapped onto [0, 1]
+        return lambda score: (score + 1.0) / 2.0
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Bytes of the searched index and of the float32 re-score copy"""
+        with self._lock:
+            index = sum(self._arrays[name][:self._size].nbytes for name in ("codes", "scales") if name in self._arrays)
+            full = self._arrays["full"][:self._size].nbytes if "full" in self._arrays else 0
+            # A persisted re-score copy is a memmap and stays on disk
+            resident = index + (full if not isinstance(self._arrays.get("full"), np.memmap) else 0)
+        return {"index_bytes": index, "rescore_bytes": full, "resident_bytes": resident}
+
+    def _replace_file(self, name: str, write):
+        """Write a file via a temp file and an atomic rename
+
+        Arrays may be memory-mapped from the file being replaced; writing
+        in place would truncate it under the map (and corrupt it if the
+        write fails), while a rename leaves the mapped inode intact.
+        """
+        path = os.path.join(self.persist_directory, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def persist(self):
+        """Write the arrays and docstore to ``persist_directory`` (if anything changed)"""
+        if not self.persist_directory or not self._dirty:
+            return
+
+        with self._lock:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            for name, array in self._arrays.items():
+                self._replace_file(f"{name}.npy", lambda f: np.save(f, array[:self._size]))
+            if self._centroids is not None:
+                self._replace_file("centroids.npy", lambda f: np.save(f, self._centroids))
+            # The docstore goes last: it is what marks the store as persisted
+            docstore = json.dumps({
+                "quantization": self.quantization,
+                "trained_size": self._trained_size,
+                "ids": self._ids,
+                "texts": self._texts,
+                "metadatas": self._metadatas,
+            })
+            self._replace_file(self.DOCSTORE_FILE, lambda f: f.write(docstore.encode('utf-8')))
+            self._dirty = False
+
+            # Re-score rows are only read a few at a time, so leave them on
+            # disk. Mapping the file just renamed into place is safe: the
+            # next persist replaces it by rename again instead of writing
+            # into it, and a write to the array copies it into memory first
+            if "full" in self._arrays and self._size:
+                self._arrays["full"] = np.load(os.path.join(self.persist_directory, "full.npy"), mmap_mode='r')
+
+    def _load(self):
+        with open(os.path.join(self.persist_directory, self.DOCSTORE_FILE)) as f:
+            docstore = json.load(f)
+        if docstore.get("quantization") != self.quantization:
+            # Stored with another encoding; start empty and let the caller rebuild
+            return
+
+        names = (
+            ["codes"]
+            + (["scales"] if self.quantization == "int8" else [])
+            + (["full"] if self.rescore else [])
+            + (["assign"] if self.ann else [])
+        )
+        paths = {name: os.path.join(self.persist_directory, f"{name}.npy") for name in names}
+        if not all(os.path.exists(path) for path in paths.values()):
+            return
+
+        # Read-only memmaps until the first write copies them into memory
+        self._arrays = {name: np.load(path, mmap_mode='r') for name, path in paths.items()}
+        self._ids = docstore["ids"]
+        self._texts = docstore["texts"]
+        self._metadatas = docstore["metadatas"]
+        self._size = len(self._ids)
+        self._rows = {doc_id: row for row, doc_id in enumerate(self._ids)}
+        self._dirty = False
+
+        centroids_path = os.path.join(self.persist_directory, "centroids.npy")
+        if self.ann and os.path.exists(centroids_path):
+            centroids = np.load(centroids_path)
+            if len(centroids) == self.ann["nlist"]:
+                self._centroids = centroids
+                self._trained_size = docstore.get("trained_size", self._size)
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, ids: Optional[List[str]] = None, persist_directory: Optional[str] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls(embedding_function=embedding, persist_directory=persist_directory, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
+
+
+def add_embedded(store: VectorStore, vectors: List[List[float]], texts: List[str], metadatas: List[dict], ids: List[str]):
+    """Insert chunks whose vectors are already computed, without re-embedding"""
+    if isinstance(store, NumpyVectorStore):
+        store.add_vectors(np.asarray(vectors, dtype=np.float32), texts, metadatas, ids)
+    elif isinstance(store, Chroma):
+        # What Chroma.add_texts does once it has the embeddings
+        store._collection.upsert(ids=ids, embeddings=[list(v) for v in vectors], metadatas=metadatas, documents=texts)
+    else:
+        raise TypeError(f"Cannot insert precomputed vectors into {type(store).__name__}")
+
+
+def create_vectorstore(backend: str, embeddings: Embeddings, persist_directory: str, **options: Any) -> VectorStore:
+    """Open the vector store backend named in a pipeline config
+
+    ``options`` (quantization, rescore, ann) tune the numpy backend; for
+    Chroma only ``ann={"type": "hnsw", ...}`` applies, mapped onto the
+    collection's ``hnsw:*`` settings.
+    """
+    if backend == "chroma":
+        if options.get("quantization"):
+            raise ValueError("Quantized storage requires the numpy vector store")
+
+        ann = options.get("ann") or {}
+        if ann and ann.get("type") != "hnsw":
+            raise ValueError(f"Chroma only supports HNSW, not {ann.get('type')}")
+        collection_metadata = {
+            f"hnsw:{key}": ann[key] for key in ("space", "M", "construction_ef", "search_ef") if key in ann
+        }
+        return Chroma(
+            embedding_function=embeddings,
+            persist_directory=persist_directory,
+            collection_metadata=collection_metadata or None,
+        )
+    elif backend == "numpy":
+        return NumpyVectorStore(embedding_function=embeddings, persist_directory=persist_directory, **options)
+    raise ValueError(f"Unknown vector store backend: {backend}")
@@ -0,0 +1,110 @@
+"""Speed/recall trade-off of ANN retrieval vs exact search.
+
+For synthetic corpora of increasing size, compares exact NumPy search,
+the NumPy IVF index at several nprobe values and (if chromadb is
+installed) Chroma's HNSW index. Reports build time, QPS, p50/p99 latency
+and recall@k against exact search. Run from the backend directory:
+
+    python -m benchmarks.bench_ann --sizes 10000,100000,1000000 --dim 384
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from app.pipelines.vectorstores import NumpyVectorStore, create_vectorstore
+from benchmarks.bench_vectorstores import LookupEmbeddings, percentiles
+from benchmarks.bench_quantization import clustered_vectors, recall
+
+
+def run_queries(search, queries):
+    found, latencies = [], []
+    start_all = time.perf_counter()
+    for query in queries:
+        start = time.perf_counter()
+        found.append(search(query))
+        latencies.append(time.perf_counter() - start)
+    qps = len(queries) / (time.perf_counter() - start_all)
+    return found, {"qps": round(qps, 1), **percentiles(latencies)}
+
+
+def numpy_store(texts, corpus, ann=None):
+    store = NumpyVectorStore(LookupEmbeddings({}), ann=ann)
+    start = time.perf_counter()
+    store.add_vectors(corpus, texts, [{} for _ in texts], texts)
+    # Search once so lazy IVF training counts as build time
+    store.similarity_search_by_vector(corpus[0], 1)
+    return store, time.perf_counter() - start
+
+
+def bench_chroma(texts, corpus, queries, truth, k, hnsw):
+    try:
+        import chromadb  # noqa: F401
+    except ImportError:
+        return None
+
+    directory = tempfile.mkdtemp()
+    try:
+        store = create_vectorstore(
+            "chroma", LookupEmbeddings(dict(zip(texts, corpus.tolist()))), directory, ann=hnsw
+        )
+        start = time.perf_counter()
+        for i in range(0, len(texts), 5000):
+            store.add_texts(texts[i:i + 5000], ids=texts[i:i + 5000])
+        build = time.perf_counter() - start
+
+        found, stats = run_queries(
+            lambda q: [d.page_content for d in store.similarity_search_by_vector(q.tolist(), k)], queries
+        )
+        return {"build_s": round(build, 2), **stats, f"recall@{k}": round(recall(found, truth), 3)}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,50000,200000")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--nprobe", default="1,4,16")
+    parser.add_argument("--chroma-max", type=int, default=50000, help="skip Chroma above this corpus size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in [int(s) for s in args.sizes.split(",")]:
+        # Tighter clusters than uniform noise: real embeddings have low intrinsic dimension
+        corpus = clustered_vectors(rng, size, args.dim, clusters=max(16, size // 200), spread=0.15)
+        queries = clustered_vectors(rng, args.queries, args.dim, clusters=max(16, size // 200), spread=0.15)
+        texts = [f"chunk-{i}" for i in range(size)]
+        nlist = int(4 * np.sqrt(size))
+
+        print(f"\n📊 {size} chunks × {args.dim} dims, {args.queries} queries, k={args.k}")
+
+        exact, build = numpy_store(texts, corpus)
+        truth, stats = run_queries(
+            lambda q: [d.page_content for d in exact.similarity_search_by_vector(q, args.k)], queries
+        )
+        print(f"  exact            build {build:6.2f}s {stats}")
+        del exact
+
+        for nprobe in [int(n) for n in args.nprobe.split(",")]:
+            ivf, build = numpy_store(texts, corpus, ann={"type": "ivf", "nlist": nlist, "nprobe": nprobe})
+            found, stats = run_queries(
+                lambda q: [d.page_content for d in ivf.similarity_search_by_vector(q, args.k)], queries
+            )
+            print(
+                f"  ivf nlist={nlist:<5d} nprobe={nprobe:<3d} build {build:6.2f}s {stats} "
+                f"recall@{args.k} {recall(found, truth):.3f}"
+            )
+            del ivf
+
+        if size <= args.chroma_max:
+            hnsw = {"type": "hnsw", "M": 16, "construction_ef": 100, "search_ef": 50}
+            result = bench_chroma(texts, corpus, queries, truth, args.k, hnsw)
+            print(f"  chroma hnsw      {result if result else 'skipped (chromadb not installed)'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""CPU and memory of the single-pass multi-config chunker vs per-pipeline splitters.
+
+Chunks one synthetic document for the default pipeline configs, once with
+a RecursiveCharacterTextSplitter per config (Document chunks, as before)
+and once with MultiConfigChunker (ChunkSpans), and checks both give the
+same chunks. Run from the backend directory:
+
+    python -m benchmarks.bench_chunking --chars 5000000
+"""
+import time
+import random
+import argparse
+import tracemalloc
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+from app.pipelines.chunking import CHUNK_SEPARATORS, MultiConfigChunker
+from app.pipelines.rag_engine import DEFAULT_PIPELINE_CONFIGS
+
+
+def synthetic_text(rng: random.Random, chars: int) -> str:
+    words = ["".join(rng.choice("abcdefghijklmnop") for _ in range(rng.randint(2, 10))) for _ in range(2000)]
+    parts, size = [], 0
+    while size < chars:
+        sentence = " ".join(rng.choice(words) for _ in range(rng.randint(5, 40)))
+        if rng.random() < 0.01:
+            # The odd long token with no spaces, like a URL or a hash
+            sentence += " " + "x" * rng.randint(300, 1500)
+        parts.append(sentence)
+        parts.append(rng.choice(["\n\n", "\n", " ", ". "]))
+        size += len(sentence) + 2
+    return "".join(parts)
+
+
+def per_config(page: Document, configs):
+    return [
+        RecursiveCharacterTextSplitter(
+            chunk_size=size, chunk_overlap=overlap, length_function=len, separators=CHUNK_SEPARATORS
+        ).split_documents([page])
+        for size, overlap in configs
+    ]
+
+
+def single_pass(page: Document, configs):
+    return MultiConfigChunker(configs).chunk(page)
+
+
+def measure(fn, page, configs):
+    start = time.perf_counter()
+    result = fn(page, configs)
+    elapsed = time.perf_counter() - start
+    del result
+
+    tracemalloc.start()
+    result = fn(page, configs)
+    _, peak = tracemalloc.get_traced_memory()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    page = Document(page_content=synthetic_text(random.Random(0), args.chars), metadata={"source": "synthetic.txt", "doc_id": "synthetic"})
+    configs = [(c["chunk_size"], c["overlap"]) for c in DEFAULT_PIPELINE_CONFIGS.values()]
+    print(f"📊 {len(page.page_content) / 1e6:.1f}M chars, configs {configs}")
+
+    baseline, base_time, base_peak, base_kept = measure(per_config, page, configs)
+    spans, span_time, span_peak, span_kept = measure(single_pass, page, configs)
+
+    same = all(
+        [chunk.page_content for chunk in chunks] == [span.text() for span in config_spans]
+        for chunks, config_spans in zip(baseline, spans)
+    )
+    print(f"  chunks per config: {[len(chunks) for chunks in baseline]}, identical: {same}")
+    print(f"  splitter per config {base_time:6.2f}s  peak {base_peak / 1e6:7.1f} MB  retained {base_kept / 1e6:7.1f} MB")
+    print(f"  single pass         {span_time:6.2f}s  peak {span_peak / 1e6:7.1f} MB  retained {span_kept / 1e6:7.1f} MB")
+    print(f"  speedup {base_time / span_time:.2f}x, retained memory {base_kept / span_kept:.1f}x smaller")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Parse throughput of the loader process pool vs worker count.
+
+Generates synthetic text PDFs (needs pypdf) and streams them through
+iter_documents with 1..N parser processes. Run from the backend directory:
+
+    python -m benchmarks.bench_parsing --files 40 --pages 60 --workers 1,2,4,8
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from app.pipelines import loaders
+
+WORDS = "retrieval augmented generation pipeline chunk embedding vector store judge context".split()
+
+
+def write_pdf(path: str, pages: int, seed: int, lines: int = 40):
+    from pypdf import PdfWriter
+    from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica"),
+    }))
+    for number in range(pages):
+        page = writer.add_blank_page(612, 792)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+        # The seed keeps files distinct, otherwise they'd be deduplicated
+        text = " ".join(
+            f"({seed} {' '.join(WORDS[(number + i + j) % len(WORDS)] for j in range(12))}) Tj 0 -14 Td"
+            for i in range(lines)
+        )
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 10 Tf 40 760 Td {text} ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+    writer.write(path)
+
+
+def run(file_paths, workers: int) -> float:
+    loaders.PARSE_WORKERS = workers
+    loaders.document_cache.clear()
+    pool = loaders.get_parse_pool()
+    if pool:
+        # Start the workers outside the timed region
+        list(pool.map(abs, range(workers)))
+
+    start = time.perf_counter()
+    pages = sum(1 for _ in loaders.iter_documents(file_paths))
+    elapsed = time.perf_counter() - start
+
+    if pool:
+        loaders._reset_parse_pool(pool)
+    return pages, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--workers", default=f"1,2,{os.cpu_count() or 1}")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        file_paths = []
+        for i in range(args.files):
+            path = os.path.join(directory, f"doc-{i}.pdf")
+            write_pdf(path, args.pages, seed=i)
+            file_paths.append(path)
+
+        print(f"📊 {args.files} PDFs × {args.pages} pages, {os.cpu_count()} CPUs")
+        baseline = None
+        for workers in [int(w) for w in args.workers.split(",")]:
+            pages, elapsed = run(file_paths, workers)
+            baseline = baseline or elapsed
+            print(
+                f"  workers={workers:<3d} {elapsed:7.2f}s {pages / elapsed:8.1f} pages/s "
+                f"({baseline / elapsed:.2f}x)"
+            )
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
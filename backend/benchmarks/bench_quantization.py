@@ -0,0 +1,95 @@
+"""Memory and recall@k of quantized NumPy vector stores vs float32.
+
+Uses clustered synthetic unit vectors (closer to real chunk embeddings
+than uniform noise). Run from the backend directory:
+
+    python -m benchmarks.bench_quantization --chunks 50000 --dim 768
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from app.pipelines.vectorstores import NumpyVectorStore
+from benchmarks.bench_vectorstores import LookupEmbeddings, percentiles
+
+MODES = [
+    ("float32", None, False),
+    ("float16", "float16", False),
+    ("float16+rescore", "float16", True),
+    ("int8", "int8", False),
+    ("int8+rescore", "int8", True),
+]
+
+
+def clustered_vectors(rng, count: int, dim: int, clusters: int = 64, spread: float = 0.35) -> np.ndarray:
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(0, clusters, size=count)] + spread * rng.normal(size=(count, dim))
+    vectors = vectors.astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build(texts, corpus, quantization, rescore, directory):
+    store = NumpyVectorStore(
+        LookupEmbeddings({}), directory, quantization=quantization, rescore=rescore
+    )
+    store.add_vectors(corpus, texts, [{} for _ in texts], texts)
+    store.persist()
+    return store
+
+
+def top_ids(store, queries, k):
+    return [[doc.page_content for doc in hits] for hits in store.similarity_search_by_vectors(queries, k)]
+
+
+def recall(found, truth):
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=50000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = clustered_vectors(rng, args.chunks, args.dim)
+    queries = clustered_vectors(rng, args.queries, args.dim)
+    texts = [f"chunk-{i}" for i in range(args.chunks)]
+
+    print(f"📊 {args.chunks} chunks × {args.dim} dims, {args.queries} queries, recall@{args.k} vs float32")
+
+    truth = None
+    baseline_bytes = None
+    for label, quantization, rescore in MODES:
+        directory = tempfile.mkdtemp()
+        try:
+            store = build(texts, corpus, quantization, rescore, directory)
+            memory = store.memory_usage()
+
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                store.similarity_search_by_vector(query, args.k)
+                latencies.append(time.perf_counter() - start)
+
+            found = top_ids(store, queries, args.k)
+            if truth is None:
+                truth, baseline_bytes = found, memory["index_bytes"]
+
+            print(
+                f"  {label:16s} index {memory['index_bytes'] / 1e6:8.1f} MB "
+                f"({baseline_bytes / memory['index_bytes']:.1f}x smaller), "
+                f"resident {memory['resident_bytes'] / 1e6:8.1f} MB, "
+                f"recall@{args.k} {recall(found, truth):.3f}, {percentiles(latencies)}"
+            )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,395 @@
+"""Offline end-to-end performance suite: ingest, query and evaluate.
+
+Needs no network. LLM calls go to a local stub server (benchmarks.stub_llm)
+with configurable latency, jitter and 429 injection, and embeddings come
+from a fast hashing embedder unless --embedder real is given (that needs
+the sentence-transformers models in the local HuggingFace cache). For each
+synthetic corpus size it measures, on RAGComparator directly and through
+the FastAPI endpoints:
+
+- ingest throughput and time per stage (load, chunk, embed), cold and
+  again with a warm embedding cache
+- query latency percentiles per answer and per stage
+- /upload-and-ingest, /evaluate and /evaluate/stream latency
+- peak RSS per phase, and LLM calls, retries and 429s per phase
+
+All state lives in a temporary working directory. Results are written as
+JSON with the git commit and can be compared with an earlier run. Run from
+the backend directory:
+
+    python -m benchmarks.bench_suite --sizes 1MB,16MB --output bench.json
+    python -m benchmarks.bench_suite --sizes 1MB,16MB --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from typing import Dict, List, Optional
+
+# Offline: app.config insists on a key, and models must come from the local cache
+os.environ.setdefault("GROQ_API_KEY", "offline-benchmark")
+os.environ.setdefault("HF_HUB_OFFLINE", "1")
+os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+import numpy as np  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from langchain.schema.embeddings import Embeddings  # noqa: E402
+
+import app.main as api  # noqa: E402
+from app.llm.client import LLMClient, llm_client_stats, set_llm_client  # noqa: E402
+from app.pipelines.embeddings import EMBEDDER_MODELS, embedding_registry  # noqa: E402
+from app.pipelines.rag_engine import DEFAULT_PIPELINE_CONFIGS, MAX_CONCURRENCY, RAGComparator  # noqa: E402
+from benchmarks.corpus import format_size, parse_size, vocabulary, write_corpus  # noqa: E402
+from benchmarks.stub_llm import StubLLMServer  # noqa: E402
+
+CLIENT_COUNTERS = ("calls", "retries", "rate_limited", "failures")
+
+# Leaves compared against a baseline run
+COMPARED_SUFFIXES = (
+    "wall_s", "mb_per_s", "answers_per_s", "p50_ms", "p95_ms", "p99_ms",
+    "peak_rss_mb", "requests", "rate_limited", "retries", "first_result_s",
+)
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic unit vectors seeded by the text's hash.
+
+    Microseconds per text, so the pipeline around the model is what gets
+    measured; identical texts get identical vectors, as with a real model.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+
+    def _vector(self, text: str) -> List[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+        vector = np.random.default_rng(seed).standard_normal(self.dim).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vector(text)
+
+
+class PeakRSS:
+    """Peak resident set size of this process while the block runs"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def current() -> int:
+        try:
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError):
+            # No procfs: fall back to the process-lifetime peak
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            return peak if sys.platform == "darwin" else peak * 1024
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self.peak = self.current()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+    @property
+    def peak_mb(self) -> float:
+        return round(self.peak / 1e6, 1)
+
+
+def latency_summary(seconds: List[float]) -> Dict:
+    if not seconds:
+        return {"count": 0}
+    ms = np.asarray(seconds) * 1000
+    return {
+        "count": len(seconds),
+        "mean_ms": round(float(ms.mean()), 2),
+        "p50_ms": round(float(np.percentile(ms, 50)), 2),
+        "p95_ms": round(float(np.percentile(ms, 95)), 2),
+        "p99_ms": round(float(np.percentile(ms, 99)), 2),
+        "max_ms": round(float(ms.max()), 2),
+    }
+
+
+class LLMCounter:
+    """LLM traffic during a phase: stub server and client counters"""
+
+    def __init__(self, stub: StubLLMServer):
+        self.stub = stub
+        self.server = stub.stats()
+        self.client = llm_client_stats() or {}
+
+    def delta(self) -> Dict[str, int]:
+        server, client = self.stub.stats(), llm_client_stats() or {}
+        counts = {key: value - self.server.get(key, 0) for key, value in server.items()}
+        counts.update({f"client_{key}": client.get(key, 0) - self.client.get(key, 0) for key in CLIENT_COUNTERS})
+        return counts
+
+
+def make_questions(vocab: np.ndarray, count: int, seed: int) -> List[str]:
+    rng = np.random.default_rng(seed)
+    return [
+        f"What does the corpus say about {a} and {b}?"
+        for a, b in vocab[rng.integers(0, len(vocab), size=(count, 2))]
+    ]
+
+
+def bench_ingest(paths: List[str], total_bytes: int, stub: StubLLMServer):
+    comparator = RAGComparator()
+    counter = LLMCounter(stub)
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        stats = comparator.ingest_documents(paths)
+        wall = time.perf_counter() - start
+
+    return comparator, {
+        "wall_s": round(wall, 3),
+        "mb_per_s": round(total_bytes / 1e6 / wall, 3),
+        "chunks": {
+            name: sum(len(ids) for ids in pipeline.owner.document_chunks.values())
+            for name, pipeline in comparator.pipelines.items()
+        },
+        "stages_s": stats["timings"],
+        "embedding_cache": stats["embedding_cache"],
+        "peak_rss_mb": rss.peak_mb,
+        "llm": counter.delta(),
+    }
+
+
+def bench_query(comparator: RAGComparator, questions: List[str], max_concurrency: int, stub: StubLLMServer) -> Dict:
+    counter = LLMCounter(stub)
+    with PeakRSS() as rss:
+        start = time.perf_counter()
+        results = comparator.compare_pipelines(questions, max_concurrency=max_concurrency)
+        wall = time.perf_counter() - start
+
+    answers = [answer for per_question in results.values() for answer in per_question.values()]
+    stages = sorted({stage for answer in answers for stage in answer["timings"]})
+    return {
+        "questions": len(questions),
+        "answers": len(answers),
+        "wall_s": round(wall, 3),
+        "answers_per_s": round(len(answers) / wall, 2),
+        "latency": latency_summary([answer["processing_time"] for answer in answers]),
+        "stages": {
+            stage: latency_summary([answer["timings"][stage] for answer in answers if stage in answer["timings"]])
+            for stage in stages
+        },
+        "tokens": {
+            kind: sum(answer["tokens"].get(kind, 0) for answer in answers) for kind in ("prompt", "completion")
+        },
+        "peak_rss_mb": rss.peak_mb,
+        "llm": counter.delta(),
+    }
+
+
+def bench_api(paths: List[str], questions: List[str], args, stub: StubLLMServer) -> Dict:
+    # No startup restore: the corpus is uploaded below
+    client = TestClient(api.app)
+    counter = LLMCounter(stub)
+    result = {}
+
+    with PeakRSS() as rss:
+        files = [("files", (os.path.basename(path), open(path, "rb"), "text/plain")) for path in paths]
+        try:
+            start = time.perf_counter()
+            response = client.post("/upload-and-ingest", files=files)
+            result["upload_and_ingest_wall_s"] = round(time.perf_counter() - start, 3)
+        finally:
+            for _, (_, f, _) in files:
+                f.close()
+        response.raise_for_status()
+
+        latencies = []
+        for i in range(args.eval_requests):
+            batch = questions[i * args.eval_questions:(i + 1) * args.eval_questions]
+            start = time.perf_counter()
+            response = client.post("/evaluate", json={"test_questions": batch, "max_concurrency": args.max_concurrency})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+        result["evaluate"] = latency_summary(latencies)
+
+        batch = questions[args.eval_requests * args.eval_questions:][:args.eval_questions]
+        first = None
+        start = time.perf_counter()
+        with client.stream("POST", "/evaluate/stream", json={"test_questions": batch}) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if line and first is None:
+                    first = time.perf_counter() - start
+        result["evaluate_stream"] = {
+            "first_result_s": round(first or 0.0, 3),
+            "wall_s": round(time.perf_counter() - start, 3),
+        }
+
+    result["peak_rss_mb"] = rss.peak_mb
+    result["llm"] = counter.delta()
+    return result
+
+
+def bench_size(size: int, args, vocab: np.ndarray, stub: StubLLMServer) -> Dict:
+    label = format_size(size)
+    print(f"\n📊 Corpus {label}")
+
+    start = time.perf_counter()
+    paths = write_corpus(os.path.join("corpus", label), size, files=args.files, seed=size % 100003)
+    total = sum(os.path.getsize(path) for path in paths)
+    result = {"corpus": {"bytes": total, "files": len(paths), "write_s": round(time.perf_counter() - start, 3)}}
+
+    comparator, result["ingest"] = bench_ingest(paths, total, stub)
+    print(f"  ingest        {result['ingest']['mb_per_s']} MB/s, stages {result['ingest']['stages_s']}")
+
+    if not args.skip_warm:
+        # Same files again: every chunk vector comes from the embedding cache
+        del comparator
+        comparator, result["ingest_warm"] = bench_ingest(paths, total, stub)
+        print(f"  ingest (warm) {result['ingest_warm']['mb_per_s']} MB/s")
+
+    questions = make_questions(vocab, args.questions + (args.eval_requests + 1) * args.eval_questions, seed=size)
+    result["query"] = bench_query(comparator, questions[:args.questions], args.max_concurrency, stub)
+    print(f"  query         {result['query']['latency']}")
+    del comparator
+
+    if total <= parse_size(args.api_max):
+        result["api"] = bench_api(paths, questions[args.questions:], args, stub)
+        print(f"  /evaluate     {result['api']['evaluate']}")
+    else:
+        print(f"  api           skipped (corpus above --api-max {args.api_max})")
+
+    shutil.rmtree(os.path.join("corpus", label), ignore_errors=True)
+    return result
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(tree: Dict, prefix: str = "") -> Dict[str, float]:
+    leaves = {}
+    for key, value in tree.items():
+        path = f"{prefix}.{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            leaves.update(flatten(value, path))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            leaves[path] = value
+    return leaves
+
+
+def compare(report: Dict, baseline: Dict):
+    new, old = flatten(report["results"]), flatten(baseline["results"])
+    print(f"\n📊 Compared with {(baseline.get('commit') or 'baseline')[:10]}")
+    for key in sorted(new.keys() & old.keys()):
+        if not key.endswith(COMPARED_SUFFIXES) or (not old[key] and not new[key]):
+            continue
+        change = f"{(new[key] - old[key]) / old[key] * 100:+7.1f}%" if old[key] else "    n/a"
+        print(f"  {key:55s} {old[key]:12.3f} → {new[key]:12.3f}  {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1MB,16MB", help="corpus sizes, e.g. 1MB,100MB,1GB")
+    parser.add_argument("--files", type=int, default=4, help="files per corpus")
+    parser.add_argument("--questions", type=int, default=20, help="questions for the direct query phase")
+    parser.add_argument("--eval-requests", type=int, default=3, help="/evaluate requests per corpus")
+    parser.add_argument("--eval-questions", type=int, default=4, help="questions per /evaluate request")
+    parser.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--api-max", default="64MB", help="skip the endpoint phase above this corpus size")
+    parser.add_argument("--skip-warm", action="store_true", help="skip the warm-cache re-ingest")
+    parser.add_argument("--vector-store", choices=["chroma", "numpy"], help="override every pipeline's vector store")
+    parser.add_argument("--embedder", choices=["hash", "real"], default="hash")
+    parser.add_argument("--dim", type=int, default=384, help="hash embedder dimensions")
+    parser.add_argument("--latency-ms", type=float, default=150.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.02, help="share of LLM requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.05)
+    parser.add_argument("--rpm", type=int, default=0, help="client request rate limit (0 = off)")
+    parser.add_argument("--tpm", type=int, default=0, help="client token rate limit (0 = off)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary working directory")
+    args = parser.parse_args()
+
+    if args.vector_store:
+        for config in DEFAULT_PIPELINE_CONFIGS.values():
+            config["vector_store"] = args.vector_store
+
+    if args.embedder == "hash":
+        for embedder_name in EMBEDDER_MODELS:
+            embedding_registry.register(embedder_name, HashEmbeddings(args.dim))
+
+    stub = StubLLMServer(args.latency_ms, args.jitter_ms, args.error_rate, args.retry_after)
+    url = stub.start()
+    client = LLMClient(base_url=url, requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    previous = set_llm_client(client)
+
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    results = {}
+    try:
+        vocab = vocabulary()
+        for size in [parse_size(s) for s in args.sizes.split(",")]:
+            results[format_size(size)] = bench_size(size, args, vocab, stub)
+    finally:
+        os.chdir(cwd)
+        set_llm_client(previous)
+        client.close()
+        stub.stop()
+        if args.keep:
+            print(f"📁 Working directory kept at {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "suite": "offline",
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "baseline", "keep")},
+        "results": results,
+    }
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n✓ Wrote {output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Retrieval latency: NumPy vector store vs Chroma.
+
+Uses random unit vectors and a lookup-table embedder so only the vector
+store itself is timed. Run from the backend directory:
+
+    python -m benchmarks.bench_vectorstores --chunks 20000 --dim 384
+"""
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from langchain.schema.embeddings import Embeddings
+
+from app.pipelines.vectorstores import NumpyVectorStore
+
+
+class LookupEmbeddings(Embeddings):
+    """Returns precomputed vectors so embedding cost is not measured"""
+
+    def __init__(self, vectors: dict):
+        self.vectors = vectors
+
+    def embed_documents(self, texts):
+        return [self.vectors[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.vectors[text]
+
+
+def unit_vectors(rng, count: int, dim: int) -> np.ndarray:
+    vectors = rng.normal(size=(count, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def percentiles(latencies):
+    latencies = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+    }
+
+
+def time_queries(search, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        search(query)
+        latencies.append(time.perf_counter() - start)
+    return percentiles(latencies)
+
+
+def bench_numpy(texts, corpus, queries, k, batch_size):
+    directory = tempfile.mkdtemp()
+    try:
+        store = NumpyVectorStore(LookupEmbeddings(dict(zip(texts, corpus.tolist()))), directory)
+
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            store.add_texts(texts[i:i + batch_size], ids=texts[i:i + batch_size])
+        store.persist()
+        build = time.perf_counter() - start
+
+        single = time_queries(lambda q: store.similarity_search_by_vector(q, k), queries)
+
+        start = time.perf_counter()
+        store.similarity_search_by_vectors(queries, k)
+        batched = (time.perf_counter() - start) / len(queries) * 1000
+
+        return {"build_s": round(build, 3), **single, "batched_per_query_ms": round(batched, 4)}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def bench_chroma(texts, corpus, queries, k, batch_size):
+    try:
+        from langchain_community.vectorstores import Chroma
+        import chromadb  # noqa: F401
+    except ImportError:
+        return None
+
+    directory = tempfile.mkdtemp()
+    try:
+        store = Chroma(
+            embedding_function=LookupEmbeddings(dict(zip(texts, corpus.tolist()))),
+            persist_directory=directory,
+        )
+
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            store.add_texts(texts[i:i + batch_size], ids=texts[i:i + batch_size])
+        build = time.perf_counter() - start
+
+        single = time_queries(lambda q: store.similarity_search_by_vector(q.tolist(), k), queries)
+        return {"build_s": round(build, 3), **single}
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    corpus = unit_vectors(rng, args.chunks, args.dim)
+    queries = unit_vectors(rng, args.queries, args.dim)
+    texts = [f"chunk-{i}" for i in range(args.chunks)]
+
+    print(f"📊 {args.chunks} chunks × {args.dim} dims, {args.queries} queries, k={args.k}")
+    print(f"  numpy : {bench_numpy(texts, corpus, queries, args.k, args.batch_size)}")
+
+    chroma = bench_chroma(texts, corpus, queries, args.k, args.batch_size)
+    print(f"  chroma: {chroma if chroma else 'skipped (chromadb not installed)'}")
+
+
+if __name__ == "__main__":
+    main()
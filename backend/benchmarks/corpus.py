@@ -0,0 +1,91 @@
+"""Synthetic text corpora of a given size (1MB to 1GB and beyond).
+
+Text is random words from a fixed vocabulary with sentence, line and
+paragraph breaks, written in 1 MB blocks so memory stays flat whatever the
+size. Every file gets a different seed, so no two files (and almost no two
+chunks) are identical and nothing is deduplicated or served from the
+embedding cache on a first ingest. Run from the backend directory:
+
+    python -m benchmarks.corpus --size 100MB --files 4 --out ./data/corpus
+"""
+import os
+import argparse
+from typing import List
+
+import numpy as np
+
+BLOCK_BYTES = 1024 * 1024
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+
+
+def parse_size(text: str) -> int:
+    """'16MB' -> bytes (plain numbers are bytes)"""
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit, factor in reversed(list(UNITS.items())):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return str(size)
+
+
+def vocabulary(seed: int = 0, size: int = 5000) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    letters = np.array(list("abcdefghijklmnopqrstuvwxyz"))
+    lengths = rng.integers(2, 11, size=size)
+    return np.array(["".join(rng.choice(letters, length)) for length in lengths])
+
+
+def text_blocks(total_bytes: int, seed: int, vocab: np.ndarray):
+    """Yield ~1 MB strings adding up to about ``total_bytes``"""
+    rng = np.random.default_rng(seed)
+    # Sentences of ~12 words, lines of ~25, paragraphs of ~50
+    separators = np.array([" ", ". ", "\n", "\n\n"])
+    weights = np.array([0.86, 0.08, 0.04, 0.02])
+    mean_word = float(np.mean(np.char.str_len(vocab))) + 1.3
+
+    written = 0
+    while written < total_bytes:
+        count = max(1, int(min(BLOCK_BYTES, total_bytes - written) / mean_word))
+        words = vocab[rng.integers(0, len(vocab), size=count)]
+        gaps = separators[rng.choice(len(separators), size=count, p=weights)]
+        block = "".join(np.char.add(words, gaps).tolist())
+        written += len(block)
+        yield block
+
+
+def write_corpus(directory: str, total_bytes: int, files: int = 1, seed: int = 0) -> List[str]:
+    """Write ``files`` .txt files totalling about ``total_bytes``"""
+    os.makedirs(directory, exist_ok=True)
+    vocab = vocabulary()
+    paths = []
+    per_file = max(1, total_bytes // files)
+    for index in range(files):
+        path = os.path.join(directory, f"corpus_{seed}_{index:03d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            for block in text_blocks(per_file, seed * 100003 + index, vocab):
+                f.write(block)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", default="16MB")
+    parser.add_argument("--files", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="./data/corpus")
+    args = parser.parse_args()
+
+    paths = write_corpus(args.out, parse_size(args.size), args.files, args.seed)
+    total = sum(os.path.getsize(p) for p in paths)
+    print(f"✓ Wrote {len(paths)} files, {total / 1e6:.1f} MB to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
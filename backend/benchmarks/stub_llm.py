@@ -0,0 +1,200 @@
+"""Local stand-in for Groq's chat-completions API, for offline benchmarks.
+
+Answers generation prompts with text taken from the prompt's context and
+judge prompts with well-formed (deterministic) verdict JSON, after a
+configurable latency with jitter. A share of requests can be rejected
+with 429 and a Retry-After header to exercise the client's backoff.
+Usage reports approximate tokens as 4 characters each. Run standalone
+from the backend directory and point the app at it with GROQ_BASE_URL:
+
+    python -m benchmarks.stub_llm --port 8001 --latency-ms 300 --error-rate 0.05
+"""
+import re
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+CHARS_PER_TOKEN = 4
+
+
+def _scores(text: str) -> Dict:
+    """Deterministic 1-10 scores for a judged answer"""
+    digest = hashlib.sha256(text.encode('utf-8')).digest()
+    return {
+        "accuracy": 4 + digest[0] % 7,
+        "relevance": 4 + digest[1] % 7,
+        "completeness": 4 + digest[2] % 7,
+        "reasoning": "Synthetic verdict from the stub LLM server",
+    }
+
+
+class StubLLMServer:
+    """Threaded HTTP server speaking the chat-completions protocol"""
+
+    def __init__(
+        self,
+        latency_ms: float = 200.0,
+        jitter_ms: float = 50.0,
+        error_rate: float = 0.0,
+        retry_after: float = 0.1,
+        answer_words: int = 60,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.answer_words = answer_words
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self) -> str:
+        """Serve from a background thread; returns the base URL"""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self.url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._counts)
+
+    def _count(self, key: str):
+        with self._lock:
+            self._counts[key] = self._counts.get(key, 0) + 1
+
+    def _draw(self):
+        """Whether to reject this request, and how long to take otherwise"""
+        with self._lock:
+            rejected = self._rng.random() < self.error_rate
+            delay = max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+        return rejected, delay
+
+    def completion(self, request: Dict) -> Dict:
+        """The chat.completion object answering ``request``"""
+        messages: List[Dict] = request.get("messages", [])
+        prompt = messages[-1]["content"] if messages else ""
+
+        if "ANSWER ID:" in prompt:
+            kind = "judge_batch"
+            ids = re.findall(r"### ANSWER ID: (\S+)", prompt)
+            content = json.dumps([{"id": answer_id, **_scores(prompt + answer_id)} for answer_id in ids])
+        elif "Respond ONLY with valid JSON" in prompt:
+            kind = "judge"
+            content = json.dumps(_scores(prompt))
+        else:
+            kind = "generate"
+            context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0]
+            content = " ".join(context.split()[:self.answer_words]) or "I don't know."
+        self._count(kind)
+
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // CHARS_PER_TOKEN
+        completion_tokens = min(len(content) // CHARS_PER_TOKEN + 1, request.get("max_tokens") or 1 << 30)
+        return {
+            "id": "chatcmpl-" + hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:24],
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+                "logprobs": None,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, like the real API behind the pooled client
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("content-length", 0)))
+                if not self.path.endswith("/chat/completions"):
+                    self._reply(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                stub._count("requests")
+                rejected, delay = stub._draw()
+                if rejected:
+                    stub._count("rate_limited")
+                    self._reply(
+                        429,
+                        {"error": {"message": "Rate limit reached", "type": "tokens", "code": "rate_limit_exceeded"}},
+                        {"retry-after": str(stub.retry_after)},
+                    )
+                    return
+
+                time.sleep(delay)
+                self._reply(200, stub.completion(json.loads(body or b"{}")))
+
+            def _reply(self, status: int, payload: Dict, headers: Optional[Dict] = None):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency-ms", type=float, default=200.0)
+    parser.add_argument("--jitter-ms", type=float, default=50.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with a 429")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubLLMServer(
+        args.latency_ms, args.jitter_ms, args.error_rate, args.retry_after,
+        seed=args.seed, host=args.host, port=args.port,
+    )
+    print(f"📡 Stub LLM server on {server.url} (set GROQ_BASE_URL to use it)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {server.stats()}")
+
+
+if __name__ == "__main__":
+    main()